@@ -0,0 +1,299 @@
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from langchain_core.documents import Document
+from cosine_faiss import CosineFAISS, normalize_vectors
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq')
+
+METRICS = ('cosine', 'l2')
+
+DEFAULT_INDEX_OPTIONS = {
+    'index_type': 'flat',
+    'metric': 'cosine',     # cosine: L2-normalized vectors in an inner-product index
+    'float16': False,       # store vectors as fp16 (half the memory) instead of fp32
+    'nlist': 256,           # IVF cells
+    'nprobe': 16,           # IVF cells visited per query
+    'hnsw_m': 32,           # HNSW graph degree
+    'ef_construction': 200,
+    'ef_search': 64,
+    'pq_m': 64,             # PQ sub-quantizers (must divide the dimension)
+    'pq_nbits': 8,
+    'train_size': 50_000    # vectors sampled for IVF/PQ training
+}
+
+# faiss recommends ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+# Texts embedded between two progress reports
+PROGRESS_SLICE = 256
+
+
+def resolve_options(index_options: Optional[Dict]) -> Dict:
+    options = dict(DEFAULT_INDEX_OPTIONS)
+    options.update({key: value for key, value in (index_options or {}).items() if value is not None})
+    if options['index_type'] not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {options['index_type']}, expected one of {INDEX_TYPES}")
+    if options['metric'] not in METRICS:
+        raise ValueError(f"Unknown metric {options['metric']}, expected one of {METRICS}")
+    return options
+
+
+def largest_divisor(dimension: int, limit: int) -> int:
+    for m in range(min(limit, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors: np.ndarray, index_type: str = 'flat', faiss_metric: Optional[int] = None, **options):
+    """
+    Builds, trains (on a random sample) and fills a FAISS index.
+
+    Falls back to a flat index when the corpus is too small to train the
+    requested quantizer, since IVF/PQ on a few hundred vectors is slower and
+    less accurate than an exhaustive scan. faiss_metric (a faiss METRIC_*
+    constant) overrides the 'metric' option, e.g. when rebuilding an existing index.
+    """
+    faiss = dependable_faiss_import()
+    options = resolve_options({**options, 'index_type': index_type})
+    metric = faiss_metric
+    if metric is None:
+        metric = faiss.METRIC_INNER_PRODUCT if options['metric'] == 'cosine' else faiss.METRIC_L2
+    if metric == faiss.METRIC_INNER_PRODUCT:
+        vectors = normalize_vectors(vectors)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, vectors.shape[-1])
+    n, d = vectors.shape
+    fp16 = faiss.ScalarQuantizer.QT_fp16
+
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        nlist = min(options['nlist'], n // MIN_POINTS_PER_CENTROID)
+        min_points = (2 ** options['pq_nbits']) * MIN_POINTS_PER_CENTROID if index_type == 'ivf_pq' else 0
+        if nlist < 1 or n < min_points:
+            print(f"--Only {n} vectors, too few to train {index_type}; using a flat index")
+            index_type = 'flat'
+
+    if index_type == 'flat':
+        if options['float16']:
+            index = faiss.IndexScalarQuantizer(d, fp16, metric)
+        else:
+            index = faiss.IndexFlatIP(d) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(d)
+    elif index_type == 'hnsw':
+        if options['float16']:
+            index = faiss.IndexHNSWSQ(d, fp16, options['hnsw_m'], metric)
+        else:
+            index = faiss.IndexHNSWFlat(d, options['hnsw_m'], metric)
+        index.hnsw.efConstruction = options['ef_construction']
+    else:
+        quantizer = faiss.IndexFlatIP(d) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(d)
+        if index_type == 'ivf_flat' and options['float16']:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, fp16, metric)
+        elif index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        else:
+            pq_m = largest_divisor(d, options['pq_m'])
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, options['pq_nbits'], metric)
+
+        sample = vectors
+        if n > options['train_size']:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, options['train_size'], replace=False)]
+        start_time = time.time()
+        index.train(sample)
+        print(f"Trained {index_type} (nlist={nlist}) on {len(sample)} vectors in {time.time() - start_time:.2f}s")
+
+    set_search_params(index, options)
+    index.add(vectors)
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        # MMR re-ranking reconstructs candidate vectors by position
+        index.make_direct_map()
+    return index
+
+
+def set_search_params(index, index_options: Optional[Dict]) -> None:
+    """ Applies nprobe / efSearch to an index that supports them """
+    faiss = dependable_faiss_import()
+    options = resolve_options(index_options)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(options['nprobe'], ivf.nlist)
+    if hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = options['ef_search']
+
+
+def supports_remove(index) -> bool:
+    """
+    Only flat (fp32 or fp16) indexes renumber positions on remove_ids the way
+    LangChain's FAISS.delete expects; HNSW cannot remove at all and IVF keeps
+    stale ids.
+    """
+    faiss = dependable_faiss_import()
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def matches_options(index, index_options: Optional[Dict]) -> bool:
+    """ An index built with another metric cannot be patched incrementally """
+    faiss = dependable_faiss_import()
+    options = resolve_options(index_options)
+    expected = faiss.METRIC_INNER_PRODUCT if options['metric'] == 'cosine' else faiss.METRIC_L2
+    return index.metric_type == expected
+
+
+def wrap_index(embedding, index, docstore, index_to_docstore_id) -> FAISS:
+    """ LangChain store matching the index metric: inner-product indexes are cosine stores """
+    faiss = dependable_faiss_import()
+    store_class = CosineFAISS if index.metric_type == faiss.METRIC_INNER_PRODUCT else FAISS
+    return store_class(embedding, index, docstore, index_to_docstore_id)
+
+
+def delete_vectors(vector_db: FAISS, ids: List[str], index_options: Optional[Dict] = None) -> None:
+    """
+    Deletes documents by ID from any index type.
+
+    Flat indexes delete in place. ANN indexes are rebuilt from their own
+    stored vectors minus the deleted rows, so nothing is re-embedded.
+    """
+    if supports_remove(vector_db.index):
+        vector_db.delete(ids=ids)
+        return
+
+    to_delete = set(ids)
+    keep = [(position, doc_id) for position, doc_id in sorted(vector_db.index_to_docstore_id.items())
+            if doc_id not in to_delete]
+    vectors = np.vstack([vector_db.index.reconstruct(position) for position, _ in keep]) if keep else \
+        np.zeros((0, vector_db.index.d), dtype=np.float32)
+
+    options = resolve_options(index_options)
+    vector_db.index = build_index(vectors, faiss_metric=vector_db.index.metric_type, **options)
+    vector_db.docstore.delete(list(to_delete))
+    vector_db.index_to_docstore_id = {i: doc_id for i, (_, doc_id) in enumerate(keep)}
+
+
+def add_chunks(vector_db: FAISS, chunks: List[Document], ids: List[str],
+               vectors: Optional[np.ndarray] = None) -> None:
+    """ Adds chunks to a store, embedding them only when no precomputed vectors are given """
+    if vectors is None:
+        vector_db.add_documents(chunks, ids=ids)
+        return
+    if isinstance(vector_db, CosineFAISS):
+        vectors = normalize_vectors(vectors)
+    vector_db.add_embeddings(
+        list(zip([chunk.page_content for chunk in chunks], vectors)),
+        metadatas=[chunk.metadata for chunk in chunks],
+        ids=ids
+    )
+
+
+def embed_in_slices(embedding, texts: List[str], progress: Optional[Callable[[str, int, int], None]] = None,
+                    slice_size: int = PROGRESS_SLICE) -> np.ndarray:
+    """ Embeds texts slice by slice so progress (and cancellation) can be reported between slices """
+    vectors = []
+    if progress:
+        progress('embed', 0, len(texts))
+    for start in range(0, len(texts), slice_size):
+        vectors.extend(embedding.embed_documents(texts[start:start + slice_size]))
+        if progress:
+            progress('embed', min(start + slice_size, len(texts)), len(texts))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def build_vector_store(chunks: List[Document], ids: List[str], embedding,
+                       index_options: Optional[Dict] = None,
+                       progress: Optional[Callable[[str, int, int], None]] = None,
+                       vectors: Optional[np.ndarray] = None) -> FAISS:
+    """ Embeds the chunks (unless their vectors are given) and wraps the configured index type in a LangChain FAISS store """
+    options = resolve_options(index_options)
+    if vectors is None:
+        vectors = embed_in_slices(embedding, [chunk.page_content for chunk in chunks], progress)
+    index = build_index(vectors, **options)
+
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=chunk.page_content, metadata=chunk.metadata)
+        for doc_id, chunk in zip(ids, chunks)
+    })
+    return wrap_index(embedding, index, docstore, dict(enumerate(ids)))
+
+
+def benchmark(vectors: np.ndarray, queries: np.ndarray, k: int = 5,
+              configs: Optional[List[Dict]] = None, metric: str = 'cosine') -> List[Dict]:
+    """
+    Recall@k and per-query latency of each index config against an exact flat search.
+
+    Args:
+        vectors (np.ndarray): Corpus vectors
+        queries (np.ndarray): Query vectors
+        k (int): Neighbours per query
+        configs (list): Index option dicts, defaults to one per index type with default tuning
+        metric (str): 'cosine' or 'l2', applied to every config and the baseline
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = normalize_vectors(queries) if metric == 'cosine' else np.ascontiguousarray(queries, dtype=np.float32)
+    configs = [
+        {**config, 'metric': metric}
+        for config in configs or [{'index_type': index_type} for index_type in INDEX_TYPES]
+    ]
+
+    flat = build_index(vectors, 'flat', metric=metric)
+    _, truth = flat.search(queries, k)
+
+    results = []
+    for config in configs:
+        options = resolve_options(config)
+        start_time = time.time()
+        index = build_index(vectors, **options)
+        build_seconds = time.time() - start_time
+
+        start_time = time.time()
+        _, found = index.search(queries, k)
+        search_seconds = time.time() - start_time
+
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        results.append({
+            'index_type': options['index_type'],
+            'faiss_index': type(index).__name__,
+            'params': {key: options[key] for key in ('nlist', 'nprobe', 'hnsw_m', 'ef_search', 'pq_m', 'float16')},
+            'recall_at_k': round(hits / (len(queries) * k), 4),
+            'ms_per_query': round(1000 * search_seconds / len(queries), 3),
+            'build_seconds': round(build_seconds, 2)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark against the corpus in an existing vector store:
+    #   python ann_index.py <db_path> [num_queries]
+    from vector_store_manager import VectorStoreManager
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'new_db'
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    snapshot = VectorStoreManager(db_path, embedding=None, mmap=False).snapshot()
+    if snapshot is None:
+        sys.exit(f"No vector store found at {db_path}")
+    index = snapshot.vector_db.index
+    corpus = np.vstack([index.reconstruct(i) for i in range(index.ntotal)])
+
+    rng = np.random.default_rng(0)
+    query_vectors = corpus[rng.choice(len(corpus), min(num_queries, len(corpus)), replace=False)]
+    # Perturb the sampled vectors so queries are near, not identical to, corpus points
+    query_vectors = query_vectors + rng.normal(0, 0.01, query_vectors.shape).astype(np.float32)
+
+    configs = [
+        {'index_type': 'flat'},
+        {'index_type': 'flat', 'float16': True},
+        {'index_type': 'ivf_flat', 'nprobe': 8},
+        {'index_type': 'ivf_flat', 'nprobe': 32},
+        {'index_type': 'hnsw', 'ef_search': 32},
+        {'index_type': 'hnsw', 'ef_search': 128},
+        {'index_type': 'ivf_pq', 'nprobe': 16},
+    ]
+    print(f"Corpus: {corpus.shape[0]} vectors x {corpus.shape[1]} dims, {len(query_vectors)} queries")
+    faiss = dependable_faiss_import()
+    metric = 'cosine' if index.metric_type == faiss.METRIC_INNER_PRODUCT else 'l2'
+    for row in benchmark(corpus, query_vectors, k=5, configs=configs, metric=metric):
+        print(f"{row['index_type']:<10} ({row['faiss_index']}) recall@5={row['recall_at_k']:.3f} "
+              f"{row['ms_per_query']:.3f} ms/query  build {row['build_seconds']}s  {row['params']}")
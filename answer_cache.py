@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from cosine_faiss import normalize_vectors
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Cache of LLM answers for /api/query, matched by query-embedding similarity.
+
+    Entries are scoped by (model, prompt template hash, vector index version,
+    transformation logic hash): a cached answer is only reused when all of
+    those are identical and the new query's normalized embedding is at least
+    `threshold` cosine-similar to the cached one. Publishing a new index
+    version therefore invalidates everything automatically. Entries expire
+    after `ttl_seconds` and the least recently used are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: int = 3600, max_entries: int = 500):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def scope(model_name: str, prompt_template: str, index_version: str, transformation_logic: str) -> Tuple:
+        return (model_name, text_hash(prompt_template), index_version, text_hash(transformation_logic))
+
+    def expire(self, now: float) -> None:
+        """ Drops entries past their TTL (caller holds the lock) """
+        expired = [entry_id for entry_id, entry in self.entries.items()
+                   if now - entry['created_at'] > self.ttl_seconds]
+        for entry_id in expired:
+            del self.entries[entry_id]
+        self.evictions += len(expired)
+
+    def lookup(self, query_embedding, scope: Tuple) -> Optional[Dict]:
+        """ Returns the cached entry closest to the query within scope, or None """
+        query_vector = normalize_vectors(query_embedding)[0]
+        with self.lock:
+            self.expire(time.time())
+            candidates = [(entry_id, entry) for entry_id, entry in self.entries.items() if entry['scope'] == scope]
+            if candidates:
+                similarities = np.vstack([entry['vector'] for _, entry in candidates]) @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return {**entry['payload'], 'similarity': float(similarities[best])}
+            self.misses += 1
+            return None
+
+    def store(self, query_embedding, scope: Tuple, payload: Dict) -> None:
+        with self.lock:
+            self.entries[self.next_id] = {
+                'vector': normalize_vectors(query_embedding)[0],
+                'scope': scope,
+                'payload': payload,
+                'created_at': time.time()
+            }
+            self.next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self.entries),
+                'evictions': self.evictions
+            }
@@ -1,17 +1,25 @@
-from flask import Flask, request, jsonify, render_template, send_file, session, send_from_directory
+from flask import Flask, Request, request, jsonify, render_template, send_file, session, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
 import json
 from new_codebase_rag import CodebaseRAG
 from rag_config import check_for_file
 from execute_output import ExecuteOutput
+from answer_cache import SemanticAnswerCache
+from job_queue import JobQueue
+from upload_store import UploadStore
+from engine_registry import engines
+from result_store import ResultStore
+from execution_guard import ExecutionGuard, ScriptRunRegistry
+from new_prompt import NEW_PROMPT
 import traceback
 from utils.github import push_file_and_open_pr
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import shutil
 import tempfile
 import subprocess
+import time
+import math
 
 import configparser
 config = configparser.ConfigParser()
@@ -28,7 +36,8 @@ DB_PATH = None
 embeddings_created = False
 UPLOAD_FOLDER = config['FOLDERS']['UPLOAD_FOLDER']
 ALLOWED_EXTENSIONS = config['FOLDERS']['ALLOWED_EXTENSIONS']
-MAX_CONTENT_LENGTH = config['FOLDERS']['MAX_CONTENT_LENGTH']  # 16MB max file size
+# Written as a product (16 * 1024 * 1024); werkzeug needs the int to enforce it
+MAX_CONTENT_LENGTH = math.prod(int(factor) for factor in config['FOLDERS']['MAX_CONTENT_LENGTH'].split('*'))  # 16MB max file size
 
 ALLURE_RESULTS_DIR =  config['ALLURE']['ALLURE_RESULTS_DIR']   # raw JSON produced by pytest
 ALLURE_REPORT_DIR =  config['ALLURE']['ALLURE_REPORT_DIR']     # generated HTML dashboard
@@ -39,6 +48,66 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 # Store query results globally for dashboard access
 query_results_store = []
 
+# Content-addressed upload blobs; orphans are collected after RETENTION_DAYS
+upload_store = UploadStore(
+    UPLOAD_FOLDER,
+    retention_days=config.getfloat('UPLOADS', 'RETENTION_DAYS', fallback=30)
+)
+
+class UploadRequest(Request):
+    """ Request whose multipart file parts stream straight into the upload store's temp area """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Hashed and encoding-checked while werkzeug parses the body; upload_store.save() only renames it
+        return upload_store.open_upload()
+
+app.request_class = UploadRequest
+
+# Minimum cosine similarity of retrieved context, see [VECTOR_INDEX] SCORE_THRESHOLD
+RETRIEVAL_SCORE_THRESHOLD = config.getfloat('VECTOR_INDEX', 'SCORE_THRESHOLD', fallback=0.3)
+
+# Background embedding builds, one at a time
+embedding_jobs = JobQueue(max_workers=1)
+
+# Semantic cache of LLM answers for /api/query
+answer_cache = SemanticAnswerCache(
+    threshold=config.getfloat('ANSWER_CACHE', 'SIMILARITY_THRESHOLD', fallback=0.95),
+    ttl_seconds=config.getint('ANSWER_CACHE', 'TTL_SECONDS', fallback=3600),
+    max_entries=config.getint('ANSWER_CACHE', 'MAX_ENTRIES', fallback=500)
+)
+
+# Rows fetched per chunk when script results stream from the server-side cursor
+EXECUTION_CHUNK_ROWS = config.getint('EXECUTION', 'CHUNK_ROWS', fallback=10000)
+# Responses and query_results_store carry PREVIEW_ROWS rows per statement; full results
+# are spilled to outputs/ and paged through /api/results/<result_id>
+EXECUTION_PREVIEW_ROWS = config.getint('EXECUTION', 'PREVIEW_ROWS', fallback=100)
+MAX_PAGE_ROWS = config.getint('EXECUTION', 'MAX_PAGE_ROWS', fallback=1000)
+# Read-only statements of a script run concurrently, at most this many at a time
+EXECUTION_MAX_PARALLEL = config.getint('EXECUTION', 'MAX_PARALLEL', fallback=4)
+result_store = ResultStore(
+    root='outputs',
+    spill_format=config.get('EXECUTION', 'SPILL_FORMAT', fallback='parquet'),
+    max_results=config.getint('EXECUTION', 'MAX_SPILLED_RESULTS', fallback=200)
+)
+# Time limit, row cap and EXPLAIN pre-flight for every executed statement (0 disables a guard)
+execution_guard = ExecutionGuard(
+    timeout_seconds=config.getfloat('EXECUTION', 'MAX_EXECUTION_SECONDS', fallback=300) or None,
+    max_rows=config.getint('EXECUTION', 'MAX_ROWS', fallback=1000000) or None,
+    explain_max_scan_rows=config.getint('EXECUTION', 'EXPLAIN_MAX_SCAN_ROWS', fallback=5000000) or None,
+    explain_max_join_rows=config.getint('EXECUTION', 'EXPLAIN_MAX_JOIN_ROWS', fallback=100000000) or None
+)
+# Running scripts, cancellable through /api/script-runs/<run_id>/cancel
+script_runs = ScriptRunRegistry()
+
+# One pooled engine per database, shared by every MySQLConnection in the process
+engines.configure(
+    pool_size=config.getint('DB_POOL', 'POOL_SIZE', fallback=5),
+    max_overflow=config.getint('DB_POOL', 'MAX_OVERFLOW', fallback=10),
+    pool_timeout=config.getint('DB_POOL', 'POOL_TIMEOUT', fallback=30),
+    pool_recycle=config.getint('DB_POOL', 'POOL_RECYCLE', fallback=1800),
+    pool_pre_ping=config.getboolean('DB_POOL', 'PRE_PING', fallback=True)
+)
+
 for _dir in (UPLOAD_FOLDER, ALLURE_RESULTS_DIR, ALLURE_REPORT_DIR):
     os.makedirs(_dir, exist_ok=True)
 
@@ -49,9 +118,41 @@ def initialize_rag():
     global rag_instance, DB_PATH
     if rag_instance is None:
         DB_PATH = check_for_file()
-        rag_instance = CodebaseRAG(DB_PATH)
+        rag_instance = CodebaseRAG(
+            DB_PATH,
+            introspection_workers=config.getint('INTROSPECTION', 'WORKERS', fallback=4),
+            per_server_limit=config.getint('INTROSPECTION', 'PER_SERVER_LIMIT', fallback=4),
+            embedding_cache_path=config.get('EMBEDDINGS', 'CACHE_PATH', fallback=os.path.join('cache', 'embeddings.sqlite')),
+            embedding_cache_size=config.getint('EMBEDDINGS', 'CACHE_MAX_ENTRIES', fallback=100000),
+            embedding_options={
+                'batch_size': config.getint('EMBEDDINGS', 'BATCH_SIZE', fallback=32),
+                'max_in_flight': config.getint('EMBEDDINGS', 'MAX_IN_FLIGHT', fallback=4),
+                'queue_size': config.getint('EMBEDDINGS', 'QUEUE_SIZE', fallback=8),
+                'max_retries': config.getint('EMBEDDINGS', 'MAX_RETRIES', fallback=3)
+            },
+            index_options={
+                'index_type': config.get('VECTOR_INDEX', 'TYPE', fallback='flat'),
+                'metric': config.get('VECTOR_INDEX', 'METRIC', fallback='cosine'),
+                'float16': config.getboolean('VECTOR_INDEX', 'FLOAT16', fallback=False),
+                'nlist': config.getint('VECTOR_INDEX', 'NLIST', fallback=256),
+                'nprobe': config.getint('VECTOR_INDEX', 'NPROBE', fallback=16),
+                'hnsw_m': config.getint('VECTOR_INDEX', 'HNSW_M', fallback=32),
+                'ef_search': config.getint('VECTOR_INDEX', 'EF_SEARCH', fallback=64),
+                'pq_m': config.getint('VECTOR_INDEX', 'PQ_M', fallback=64)
+            },
+            llm_keep_alive=parse_keep_alive(config.get('LLM', 'KEEP_ALIVE', fallback='30m')),
+            chunk_workers=config.getint('EMBEDDINGS', 'CHUNK_WORKERS', fallback=os.cpu_count() or 1),
+            semantic_pooling=config.getboolean('EMBEDDINGS', 'SEMANTIC_POOLING', fallback=False)
+        )
+        if config.getboolean('LLM', 'WARMUP', fallback=True):
+            rag_instance.llm_registry.warm_async(rag_instance.llm_profiles())
     return rag_instance
 
+def parse_keep_alive(value):
+    """ Ollama takes keep_alive as a duration string ('30m') or seconds (-1 keeps models loaded) """
+    value = value.strip()
+    return int(value) if value.lstrip('-').isdigit() else value
+
 def generate_allure_report(force: bool = False):
     """Generate/update Allure HTML report (ALLURE_REPORT_DIR) from ALLURE_RESULTS_DIR.
 
@@ -167,24 +268,22 @@ def create_embeddings():
         # Clear previous uploads
         uploaded_files_info = []
         
-        # Process and save uploaded files
+        # Stream uploads into the content-addressed store; identical content is kept once
         saved_files = []
         for file in files:
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Add timestamp to avoid conflicts
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                saved_files.append(filepath)
+                stored = upload_store.save(file.stream, secure_filename(file.filename))
+                saved_files.append((stored.path, stored.name, stored.digest, stored.encoding))
                 
                 # Store file info
                 uploaded_files_info.append({
-                    'filename': filename,
+                    'filename': stored.name,
                     'original_name': file.filename,
-                    'filepath': filepath,
-                    'size': os.path.getsize(filepath)
+                    'filepath': stored.path,
+                    'digest': stored.digest,
+                    'deduplicated': stored.deduplicated,
+                    'encoding': stored.encoding,
+                    'size': stored.size
                 })
         
         if not saved_files:
@@ -192,77 +291,19 @@ def create_embeddings():
         
         # Initialize RAG system
         rag = initialize_rag()
-        
-        # Process the uploaded files to create embeddings
-        try:
-            # Read and process each file
-            documents = []
-            for filepath in saved_files:
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        # Add metadata about the file
-                        doc_with_metadata = {
-                            'content': content,
-                            'filename': os.path.basename(filepath),
-                            'filepath': filepath
-                        }
-                        documents.append(doc_with_metadata)
-                except Exception as e:
-                    print(f"Error reading file {filepath}: {str(e)}")
-                    # Try with different encoding
-                    try:
-                        with open(filepath, 'r', encoding='latin-1') as f:
-                            content = f.read()
-                            doc_with_metadata = {
-                                'content': content,
-                                'filename': os.path.basename(filepath),
-                                'filepath': filepath
-                            }
-                            documents.append(doc_with_metadata)
-                    except Exception as e2:
-                        print(f"Error reading file {filepath} with latin-1: {str(e2)}")
-                        continue
-            
-            if not documents:
-                return jsonify({'error': 'No readable documents found'}), 400
-            
-            # Create embeddings from the documents
-            temp_dir = tempfile.mkdtemp()
-            try:
-                # Copy files to temp directory
-                for doc in documents:
-                    temp_file_path = os.path.join(temp_dir, doc['filename'])
-                    shutil.copy2(doc['filepath'], temp_file_path)
-                
-                # Set the transformation path to the temp directory
+        full_rebuild = request.form.get('full_rebuild', 'false').lower() == 'true'
 
-                #hard coded the transformation path because need more time to identify the transformation script
-                # rag.transformation_path = r'D:\DATA Validation\Schemas\transformation scripts.sql'
-                rag.transformation_path = config['FOLDERS']['TRANSFORMATION']
-                
-                # Create embeddings
-                rag.create_embeddings_and_store()
-                embeddings_created = True
-                
-                return jsonify({
-                    'message': 'Embeddings created successfully',
-                    'embeddings_ready': True,
-                    'files_processed': len(documents),
-                    'file_info': uploaded_files_info
-                })
-                
-            finally:
-                # Clean up temp directory
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                
-        except Exception as e:
-            print(f"Error creating embeddings: {str(e)}")
-            print(f"Traceback: {traceback.format_exc()}")
-            return jsonify({
-                'error': f'Error creating embeddings: {str(e)}',
-                'traceback': traceback.format_exc()
-            }), 500
+        # Build in the background; the client polls /api/jobs/<job_id>
+        job = embedding_jobs.submit(
+            'create_embeddings',
+            lambda job: build_embeddings(rag, saved_files, full_rebuild, job)
+        )
+        return jsonify({
+            'message': 'Embedding job queued',
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}',
+            'file_info': uploaded_files_info
+        }), 202
             
     except Exception as e:
         print(f"General error in create_embeddings: {str(e)}")
@@ -271,14 +312,146 @@ def create_embeddings():
             'traceback': traceback.format_exc()
         }), 500
 
+def build_embeddings(rag, saved_files, full_rebuild, job):
+    """ Embedding job body: rebuilds the database index, then indexes the uploads, reporting progress to job """
+    global embeddings_created
+
+    #hard coded the transformation path because need more time to identify the transformation script
+    # rag.transformation_path = r'D:\DATA Validation\Schemas\transformation scripts.sql'
+    rag.transformation_path = config['FOLDERS']['TRANSFORMATION']
+
+    # Create embeddings (only changed tables unless a full rebuild is requested)
+    rag.create_embeddings_and_store(incremental=not full_rebuild, progress=job.progress)
+    # Then chunk the uploaded files straight from their blobs and merge them into the new index
+    files_indexed = rag.ingest_files(saved_files, progress=job.progress)
+    embeddings_created = True
+    # Cached answers are scoped to the old index version; free them now
+    answer_cache.invalidate()
+    upload_store.gc()
+
+    return {
+        'message': 'Embeddings created successfully',
+        'embeddings_ready': True,
+        'files_processed': len(saved_files),
+        'files_indexed': files_indexed
+    }
+
+@app.route('/api/jobs')
+def list_jobs():
+    """API endpoint to list recent background jobs, newest first"""
+    return jsonify(embedding_jobs.list())
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """API endpoint to poll a background job's status and per-stage progress"""
+    job = embedding_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """API endpoint to cancel a queued or running job at its next checkpoint"""
+    job = embedding_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    if not job.cancel():
+        return jsonify({'error': f'Job {job_id} already {job.status}'}), 409
+    return jsonify(job.to_dict())
+
 @app.route('/api/embeddings-status')
 def embeddings_status():
     global embeddings_created
     return jsonify({'embeddings_ready': embeddings_created})
 
+def prepare_query(query):
+    """
+    Shared setup for /api/query and /api/query/stream: pins an index snapshot,
+    picks the LLM, builds the retriever and the answer cache scope.
+    Returns None when no vector database exists yet.
+    """
+    rag = initialize_rag()
+    # Pin one index version for the whole request; rebuilds swap in a new snapshot
+    try:
+        snapshot = rag.store_manager.snapshot()
+    except Exception as e:
+        snapshot = None
+    if snapshot is None:
+        return None
+
+    # Get query classification and LLM model
+    model_name, params = rag.select_llm_optimized(query)
+
+    retriever = snapshot.vector_db.as_retriever(
+        search_type="mmr",  # Maximum Marginal Relevance for diversity
+        search_kwargs={
+            "k": 3,
+            "fetch_k": 6,
+            "lambda_mult": 0.7,  # Balance between relevance and diversity
+            "score_threshold": RETRIEVAL_SCORE_THRESHOLD  # Cosine cutoff; top-k is kept if nothing reaches it
+        }
+    )
+
+    # Answers are only reused for the same model, prompt, index version and
+    # transformation file contents
+    cache_scope = answer_cache.scope(
+        f"{model_name}:{json.dumps(params, sort_keys=True)}",
+        NEW_PROMPT.template,
+        snapshot.version,
+        rag.transformation_store.digest(rag.transformation_path)
+    )
+
+    return {
+        'rag': rag,
+        'snapshot': snapshot,
+        'model_name': model_name,
+        'params': params,
+        'llm': rag.llm_registry.get(model_name, params),
+        'prompt': NEW_PROMPT,
+        'retriever': retriever,
+        'cache_scope': cache_scope
+    }
+
+def prompt_inputs(prepared, query):
+    """ Retrieves context and fits the NEW_PROMPT variables into the model's num_ctx; returns (inputs, token usage) """
+    retrieved_docs = prepared['retriever'].invoke(query)
+    return prepared['rag'].build_prompt_inputs(query, retrieved_docs, prepared['params'])
+
+def record_query_result(query, answer, prepared, processing_time, cache_hit, first_token_time=None,
+                        prompt_tokens=None):
+    """ Stores a completed query for the dashboard """
+    query_result = {
+        'id': len(query_results_store) + 1,
+        'query': query,
+        'answer': answer,
+        'llm_model': prepared['model_name'],
+        'processing_time': round(processing_time, 2),
+        'index_version': prepared['snapshot'].version,
+        'cache_hit': cache_hit,
+        'timestamp': datetime.now().isoformat(),
+        'status': 'completed'
+    }
+    if first_token_time is not None:
+        query_result['time_to_first_token'] = round(first_token_time, 2)
+    if prompt_tokens is not None:
+        # Per-section token counts, for capacity planning
+        query_result['prompt_tokens'] = prompt_tokens
+    query_results_store.append(query_result)
+
+def record_query_error(query, error):
+    """ Stores a failed query for the dashboard """
+    query_results_store.append({
+        'id': len(query_results_store) + 1,
+        'query': query or 'Unknown query',
+        'error': str(error),
+        'timestamp': datetime.now().isoformat(),
+        'status': 'error'
+    })
+
 @app.route('/api/query', methods=['POST'])
 def query_rag():
     global query_results_store
+    query = None
     try:
         data = request.json
         query = data.get('query')
@@ -286,100 +459,141 @@ def query_rag():
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        rag = initialize_rag()
-        if not rag.vector_db:
-            try:
-                rag.load_vector_db()
-            except Exception as e:
-                return jsonify({'error': 'Vector database not found. Please create embeddings first.'}), 400
-        
-        # Get query classification and LLM model
-        model_name, params = rag.select_llm_optimized(query)
-        
-        # Process the query
-        from langchain_ollama.llms import OllamaLLM
-        from langchain.chains import LLMChain
-        from new_prompt import NEW_PROMPT
-        import time
-        
-        retriever = rag.vector_db.as_retriever(
-            search_type="mmr",  # Maximum Marginal Relevance for diversity
-            search_kwargs={
-                "k": 3,
-                "fetch_k": 6,
-                "lambda_mult": 0.7,  # Balance between relevance and diversity
-                "score_threshold": 0.7  # Lower threshold for more inclusive results
-            }
-        )
-        
-        llm = OllamaLLM(model=model_name, **params)
+        prepared = prepare_query(query)
+        if prepared is None:
+            return jsonify({'error': 'Vector database not found. Please create embeddings first.'}), 400
         
         start_time = time.time()
+
+        # Reuse the answer of a near-identical earlier question
+        query_embedding = prepared['rag'].embedding.embed_query(query)
+        cached = answer_cache.lookup(query_embedding, prepared['cache_scope'])
+        if cached:
+            end_time = time.time()
+            record_query_result(query, cached['answer'], prepared, end_time - start_time, cache_hit=True)
+            return jsonify({
+                'answer': cached['answer'],
+                'llm_model': prepared['model_name'],
+                'processing_time': round(end_time - start_time, 2),
+                'cache_hit': True,
+                'dashboard_url': '/dashboard'
+            })
         
-        # Get transformation logic if available
-        if hasattr(rag, 'transformation_path') and rag.transformation_path:
-            transformation_logic = rag.extract_transformation_logic(rag.transformation_path)
-            if isinstance(transformation_logic, list):
-                transformation_logic = "\n".join(transformation_logic)
-        else:
-            transformation_logic = "No transformation logic provided"
-        
-        # Retrieve relevant documents
-        retrieved_docs = retriever.invoke(query)
-        context = "\n".join(doc.page_content for doc in retrieved_docs)
-        
-        # Create LLM chain
-        llm_chain = LLMChain(llm=llm, prompt = NEW_PROMPT)
+        # Shared chain from the LLM registry
+        llm_chain = prepared['rag'].llm_registry.chain(prepared['model_name'], prepared['params'], prepared['prompt'])
         
         # Execute query
-        result = llm_chain.invoke({
-            "context": context,
-            "source_db": rag.source_db_config.get('database', 'source_db') if rag.source_db_config else 'source_db',
-            "target_db": rag.target_db_config.get('database', 'target_db') if rag.target_db_config else 'target_db',
-            "transformation_logic": transformation_logic,
-            "query": query
-        })
+        inputs, prompt_tokens = prompt_inputs(prepared, query)
+        result = llm_chain.invoke(inputs)
         print(result)
         end_time = time.time()
+        answer_cache.store(query_embedding, prepared['cache_scope'], {'answer': result["text"]})
         
         # Store query result for dashboard
-        query_result = {
-            'id': len(query_results_store) + 1,
-            'query': query,
-            'answer': result["text"],
-            'llm_model': model_name,
-            'processing_time': round(end_time - start_time, 2),
-            'timestamp': datetime.now().isoformat(),
-            'status': 'completed'
-        }
-        
-        query_results_store.append(query_result)
+        record_query_result(query, result["text"], prepared, end_time - start_time, cache_hit=False,
+                            prompt_tokens=prompt_tokens)
         
         return jsonify({
             'answer': result["text"],
-            'llm_model': model_name,
+            'llm_model': prepared['model_name'],
             'processing_time': round(end_time - start_time, 2),
+            'cache_hit': False,
             'dashboard_url': '/dashboard'  # Provide dashboard URL for frontend
         })
     except Exception as e:
         # Store error result for dashboard
-        error_result = {
-            'id': len(query_results_store) + 1,
-            'query': query if 'query' in locals() else 'Unknown query',
-            'error': str(e),
-            'timestamp': datetime.now().isoformat(),
-            'status': 'error'
-        }
-        query_results_store.append(error_result)
+        record_query_error(query, e)
         
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
 
+def sse_event(event, data):
+    """ Formats one Server-Sent Event with a JSON payload """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/query/stream', methods=['POST'])
+def query_rag_stream():
+    """
+    Streams the answer as Server-Sent Events while Ollama generates it.
+
+    Events: 'meta' (model, index version), one 'token' per generated chunk,
+    then 'done' with the full answer, time to first token and total latency,
+    or 'error'. The final answer is recorded for the dashboard and the
+    answer cache exactly like /api/query.
+    """
+    data = request.json or {}
+    query = data.get('query')
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+
+    def generate():
+        start_time = time.time()
+        try:
+            prepared = prepare_query(query)
+            if prepared is None:
+                yield sse_event('error', {'error': 'Vector database not found. Please create embeddings first.'})
+                return
+            yield sse_event('meta', {
+                'llm_model': prepared['model_name'],
+                'index_version': prepared['snapshot'].version
+            })
+
+            query_embedding = prepared['rag'].embedding.embed_query(query)
+            cached = answer_cache.lookup(query_embedding, prepared['cache_scope'])
+            if cached:
+                first_token_time = time.time() - start_time
+                yield sse_event('token', {'text': cached['answer']})
+                answer = cached['answer']
+                prompt_tokens = None
+            else:
+                inputs, prompt_tokens = prompt_inputs(prepared, query)
+                prompt_text = prepared['prompt'].format(**inputs)
+                first_token_time = None
+                parts = []
+                for token in prepared['llm'].stream(prompt_text):
+                    if first_token_time is None:
+                        first_token_time = time.time() - start_time
+                    parts.append(token)
+                    yield sse_event('token', {'text': token})
+                answer = "".join(parts)
+                answer_cache.store(query_embedding, prepared['cache_scope'], {'answer': answer})
+
+            processing_time = time.time() - start_time
+            record_query_result(query, answer, prepared, processing_time, cache_hit=bool(cached),
+                                first_token_time=first_token_time, prompt_tokens=prompt_tokens)
+            yield sse_event('done', {
+                'answer': answer,
+                'llm_model': prepared['model_name'],
+                'time_to_first_token': round(first_token_time or processing_time, 2),
+                'processing_time': round(processing_time, 2),
+                'cache_hit': bool(cached),
+                'dashboard_url': '/dashboard'
+            })
+        except Exception as e:
+            print(f"--Error streaming query: {e}")
+            record_query_error(query, e)
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # keep reverse proxies from buffering the stream
+    })
+
 @app.route('/api/query-results')
 def get_query_results():
     """API endpoint to get query results for dashboard"""
     global query_results_store
     return jsonify(query_results_store)
 
+@app.route('/api/cache-stats')
+def cache_stats():
+    """API endpoint to get answer cache hit/miss counts for the dashboard"""
+    return jsonify(answer_cache.stats())
+
+@app.route('/api/db-pool-stats')
+def db_pool_stats():
+    """API endpoint to get database connection pool utilization and checkout waits"""
+    return jsonify(engines.stats())
+
 @app.route('/api/clear-results', methods=['POST'])
 def clear_results():
     """API endpoint to clear query results"""
@@ -394,6 +608,8 @@ def execute_sql():
         data = request.json
         sql_query = data.get('sql_query')
         result_id = data.get('result_id')
+        # Client-chosen id, so the client can cancel the run while this request is still executing
+        run_id = data.get('run_id')
         
         if not sql_query:
             return jsonify({'error': 'SQL query is required'}), 400
@@ -410,8 +626,14 @@ def execute_sql():
             temp_sql_file.close()
             
             # Execute the query
-            executor = ExecuteOutput(script_filename=temp_sql_file.name)
-            execution_results = executor.execute_and_capture_results(rag.source_db_config)
+            run = script_runs.start('execute-sql', run_id)
+            try:
+                executor = ExecuteOutput(script_filename=temp_sql_file.name, chunk_rows=EXECUTION_CHUNK_ROWS,
+                                         result_store=result_store, preview_rows=EXECUTION_PREVIEW_ROWS,
+                                         max_parallel=EXECUTION_MAX_PARALLEL, guard=execution_guard, run=run)
+                execution_results = executor.execute_and_capture_results(rag.source_db_config)
+            finally:
+                script_runs.finish(run)
             
             # Clean up temp file
             os.unlink(temp_sql_file.name)
@@ -426,7 +648,9 @@ def execute_sql():
             
             return jsonify({
                 'message': 'SQL query executed successfully',
-                'results': execution_results
+                'results': execution_results,
+                'run_id': run.id,
+                'cancelled': run.cancelled
             })
             
         except Exception as e:
@@ -435,6 +659,34 @@ def execute_sql():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/results/<result_id>')
+def result_page(result_id):
+    """API endpoint to page through the full spilled result of an executed statement"""
+    try:
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', EXECUTION_PREVIEW_ROWS, type=int), 1), MAX_PAGE_ROWS)
+        page = result_store.page(result_id, offset, limit)
+        if page is None:
+            return jsonify({'error': f'Result {result_id} not found or expired'}), 404
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/script-runs')
+def list_script_runs():
+    """API endpoint to list running and recent script executions, newest first"""
+    return jsonify(script_runs.list())
+
+@app.route('/api/script-runs/<run_id>/cancel', methods=['POST'])
+def cancel_script_run(run_id):
+    """API endpoint to cancel a running script: kills its running queries and skips the rest"""
+    run = script_runs.get(run_id)
+    if run is None:
+        return jsonify({'error': f'Unknown script run {run_id}'}), 404
+    if not run.cancel():
+        return jsonify({'error': f'Script run {run_id} already finished'}), 409
+    return jsonify(run.to_dict())
+
 @app.route('/api/save-script', methods=['POST'])
 def save_script():
     # NEED TO CHANGE THE FOLDER FOR THE SAVING SCRIPTS AND
@@ -514,6 +766,8 @@ def execute_script():
     try:
         data = request.json
         filename = data.get('filename')
+        # Client-chosen id, so the client can cancel the run while this request is still executing
+        run_id = data.get('run_id')
         
         if not filename:
             return jsonify({'error': 'Filename is required'}), 400
@@ -527,12 +781,20 @@ def execute_script():
         if not os.path.exists(script_path):
             return jsonify({'error': f'Script file {filename} not found'}), 404
         
-        executor = ExecuteOutput(script_filename=script_path)
-        results = executor.execute_and_capture_results(rag.source_db_config)
+        run = script_runs.start('execute-script', run_id)
+        try:
+            executor = ExecuteOutput(script_filename=script_path, chunk_rows=EXECUTION_CHUNK_ROWS,
+                                     result_store=result_store, preview_rows=EXECUTION_PREVIEW_ROWS,
+                                     max_parallel=EXECUTION_MAX_PARALLEL, guard=execution_guard, run=run)
+            results = executor.execute_and_capture_results(rag.source_db_config)
+        finally:
+            script_runs.finish(run)
         
         return jsonify({
-            'message': 'Script executed successfully',
-            'results': results
+            'message': 'Script execution cancelled' if run.cancelled else 'Script executed successfully',
+            'results': results,
+            'run_id': run.id,
+            'cancelled': run.cancelled
         })
     except Exception as e:
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
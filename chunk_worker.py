@@ -0,0 +1,21 @@
+from typing import List, Tuple
+from langchain_core.documents import Document
+from chunking import EnhancedChunker
+from file_ingest import iter_documents, number_chunks
+
+# Entry point of the chunking worker processes (see file_ingest.ChunkPool). Spawned
+# workers import this module and what it needs for chunking, never app.py's RAG state,
+# so keep it free of import-time side effects.
+
+
+def chunk_file(task: Tuple) -> Tuple[str, List[Document]]:
+    """
+    Process-pool worker: reads and chunks one uploaded file.
+
+    Runs with an EnhancedChunker that has no embedding model, which is fine
+    for every non-semantic extension (code, SQL, JSON/YAML, CSV fallback).
+    Returns (name, chunks) with the file metadata and chunk position on every chunk.
+    """
+    document = next(iter_documents([task]))
+    chunks = EnhancedChunker(None).smart_chunk_documents([document])
+    return document.metadata['file_name'], number_chunks(chunks)
@@ -5,13 +5,108 @@ from langchain.text_splitter import (
     PythonCodeTextSplitter,
     Language
 )
-from langchain_experimental.text_splitter import SemanticChunker
+from langchain_core.documents import Document
+from typing import Iterable, Iterator, List, Tuple
+import numpy as np
 import re
 import os
 
+SEMANTIC_EXTENSIONS = ['.md', '.txt', '.rst']
+
+
+class BatchSemanticChunker:
+    """
+    SemanticChunker's percentile breakpoints, computed for many documents at once.
+
+    The sentences of every document in a batch (each combined with
+    buffer_size neighbours, as SemanticChunker does) are embedded in one
+    embed_documents call instead of one call per document. split() also
+    returns pooled chunk vectors: the mean of the chunk's buffer-combined
+    sentence vectors, rescaled to their average norm. They let chunks go
+    into FAISS without embedding their text a second time, but are only an
+    approximation of the chunk's embedding (the combined sentences include
+    neighbours from outside the chunk), so using them is opt-in.
+    """
+
+    def __init__(self, embedding_model, breakpoint_percentile: float = 95, buffer_size: int = 1,
+                 sentence_split_regex: str = r"(?<=[.?!])\s+"):
+        self.embedding_model = embedding_model
+        self.breakpoint_percentile = breakpoint_percentile
+        self.buffer_size = buffer_size
+        self.sentence_split_regex = sentence_split_regex
+
+    def sentences(self, text: str) -> List[str]:
+        return re.split(self.sentence_split_regex, text) if text.strip() else []
+
+    def combined(self, sentences: List[str]) -> List[str]:
+        return [
+            " ".join(sentences[max(i - self.buffer_size, 0):i + self.buffer_size + 1])
+            for i in range(len(sentences))
+        ]
+
+    def breakpoint_groups(self, vectors: np.ndarray) -> List[Tuple[int, int]]:
+        """ (start, end) sentence ranges split where the distance to the next sentence is above the percentile """
+        if len(vectors) < 2:
+            return [(0, len(vectors))]
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        unit = vectors / norms[:, None]
+        distances = 1 - np.sum(unit[:-1] * unit[1:], axis=1)
+        threshold = np.percentile(distances, self.breakpoint_percentile)
+        groups, start = [], 0
+        for index in np.nonzero(distances > threshold)[0]:
+            groups.append((start, int(index) + 1))
+            start = int(index) + 1
+        if start < len(vectors):
+            groups.append((start, len(vectors)))
+        return groups
+
+    @staticmethod
+    def pool(vectors: np.ndarray) -> np.ndarray:
+        mean = vectors.mean(axis=0)
+        norm = np.linalg.norm(mean)
+        return mean * (np.linalg.norm(vectors, axis=1).mean() / norm) if norm else mean
+
+    def split(self, documents: Iterable[Document]) -> List[Tuple[Document, List[Document], np.ndarray]]:
+        """ (document, chunks, chunk vectors) for each document, with one embedding call for the batch """
+        documents = list(documents)
+        per_document = [self.sentences(doc.page_content) for doc in documents]
+        texts = [text for sentences in per_document for text in self.combined(sentences)]
+        vectors = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32) if texts else None
+
+        results, offset = [], 0
+        for doc, sentences in zip(documents, per_document):
+            if not sentences:
+                results.append((doc, [], np.zeros((0, 0), dtype=np.float32)))
+                continue
+            doc_vectors = vectors[offset:offset + len(sentences)]
+            offset += len(sentences)
+            groups = self.breakpoint_groups(doc_vectors)
+            chunks = [
+                Document(page_content=" ".join(sentences[start:end]), metadata=dict(doc.metadata))
+                for start, end in groups
+            ]
+            results.append((doc, chunks, np.vstack([self.pool(doc_vectors[start:end]) for start, end in groups])))
+        return results
+
+    def iter_batches(self, documents: Iterable[Document],
+                     max_chars: int) -> Iterator[Tuple[Document, List[Document], np.ndarray]]:
+        """ split() over batches of about max_chars characters, pulling documents lazily """
+        batch, size = [], 0
+        for doc in documents:
+            batch.append(doc)
+            size += len(doc.page_content)
+            if size >= max_chars:
+                yield from self.split(batch)
+                batch, size = [], 0
+        if batch:
+            yield from self.split(batch)
+
+
 class EnhancedChunker:
     def __init__(self, embedding_model):
         self.embedding_model = embedding_model
+        self.semantic_chunker = BatchSemanticChunker(embedding_model)
         
     def get_code_splitter(self, language: str):
         language_map = {
@@ -47,6 +142,14 @@ class EnhancedChunker:
     
     def smart_chunk_documents(self, documents):
         all_chunks = []
+        documents = list(documents)
+        # Semantic documents are split in one batch (one embedding call for all their sentences)
+        semantic_chunks = {
+            id(doc): chunks for doc, chunks, _ in self.semantic_chunker.split(
+                doc for doc in documents
+                if os.path.splitext(doc.metadata.get('source', ''))[1].lower() in SEMANTIC_EXTENSIONS
+            )
+        }
         
         for doc in documents:
             file_path = doc.metadata.get('source', '')
@@ -59,13 +162,8 @@ class EnhancedChunker:
                 else:
                     chunks = self.fallback_code_split([doc])
             
-            elif file_ext in ['.md', '.txt', '.rst']:
-                semantic_splitter = SemanticChunker(
-                    embeddings=self.embedding_model,
-                    breakpoint_threshold_type="percentile",
-                    breakpoint_threshold_amount=95
-                )
-                chunks = semantic_splitter.split_documents([doc])
+            elif file_ext in SEMANTIC_EXTENSIONS:
+                chunks = semantic_chunks[id(doc)]
             
             # JSON/Config files - preserve structure
             elif file_ext in ['.json', '.yaml', '.yml', '.toml']:
@@ -74,17 +172,19 @@ class EnhancedChunker:
             else:
                 chunks = self.fallback_code_split([doc])
             
-            for chunk in chunks:
-                chunk.metadata.update({
-                    'file_type': file_ext,
-                    'chunk_type': self.classify_chunk_content(chunk.page_content),
-                    'language': self.detect_language(file_ext)
-                })
-            
-            all_chunks.extend(chunks)
+            all_chunks.extend(self.annotate_chunks(chunks, file_ext))
         
         return all_chunks
     
+    def annotate_chunks(self, chunks, file_ext):
+        for chunk in chunks:
+            chunk.metadata.update({
+                'file_type': file_ext,
+                'chunk_type': self.classify_chunk_content(chunk.page_content),
+                'language': self.detect_language(file_ext)
+            })
+        return chunks
+    
     def fallback_code_split(self, documents):
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=600,
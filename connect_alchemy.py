@@ -1,47 +1,158 @@
-from sqlalchemy import create_engine, text
+from contextlib import contextmanager, nullcontext
+from sqlalchemy import text
 import pandas as pd
 from langchain.schema import Document
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Iterator, Union
+from engine_registry import EngineRegistry, engines
+from result_stream import rows_frame
 
 class MySQLConnection:
-    def __init__(self, host: str, user: str, password: str, database: str, port: int = 3306):
-        self.connection_string = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+    """ Query helper over the process-wide pooled engine for one database (see engine_registry.py) """
+
+    def __init__(self, host: str, user: str, password: str, database: str, port: int = 3306,
+                 registry: Optional[EngineRegistry] = None, chunk_rows: int = 10_000):
+        self.connection_config = {'host': host, 'user': user, 'password': password, 'database': database, 'port': port}
+        self.connection_string = EngineRegistry.url(self.connection_config)
+        self.registry = registry or engines
+        # Default rows per DataFrame yielded by stream_query
+        self.chunk_rows = chunk_rows
         self.engine = None
+        # Set inside pinned(): the one connection every stream_query uses
+        self.pinned_connection = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def connect(self) -> bool:
         if self.engine:
             return True
             
         try:
-            self.engine = create_engine(self.connection_string, echo=False)
-            # Test connection
-            with self.engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            print("Successfully connected to MySQL database")
+            # Shared engine; only its first use for this database opens and probes a connection
+            self.engine = self.registry.get(self.connection_config)
             return True
         except Exception as err:
             print(f"--Error connecting to MySQL: {err}")
             return False
 
     def close(self) -> None:
-        if self.engine:
-            self.engine.dispose()
-            self.engine = None
-            print("MySQL connection closed")
+        # The pooled engine outlives this object; its connections stay open for the next caller
+        self.engine = None
 
-    def execute_query(self, query):
+    def execute_query(self, query, params: Optional[Dict] = None):
         if not self.engine:
             if not self.connect():
                 return None
         
         try:
-            df = pd.read_sql(query, self.engine)
+            with self.registry.connect(self.engine) as conn:
+                if params:
+                    df = pd.read_sql(text(query), conn, params=params)
+                else:
+                    df = pd.read_sql(query, conn)
             # print(f"Extracted {len(df)} records from MySQL")
             return df
         except Exception as e:
             print(f"--Error extracting data: {e}")
             return pd.DataFrame()
 
+    @contextmanager
+    def pinned(self):
+        """
+        Runs every stream_query of the block on one pooled connection (session variables, temp tables).
+
+        Statements are not committed one by one here, so a script's own
+        START TRANSACTION ... COMMIT/ROLLBACK decides what is kept; whatever
+        is still open is committed once when the block exits without error
+        and rolled back otherwise.
+        """
+        if not self.engine and not self.connect():
+            raise ConnectionError(f"Could not connect to {self.connection_config['database']}")
+        with self.registry.connect(self.engine) as conn:
+            self.pinned_connection = conn
+            try:
+                yield self
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self.pinned_connection = None
+
+    def kill_query(self, connection_id: int) -> None:
+        """ Stops the statement running on another server connection (KILL QUERY keeps that connection usable) """
+        with self.registry.connect(self.engine) as conn:
+            conn.exec_driver_sql(f"KILL QUERY {int(connection_id)}")
+
+    def stream_query(self, query, params: Optional[Dict] = None,
+                     chunk_rows: Optional[int] = None, watch=None) -> Iterator[pd.DataFrame]:
+        """
+        Runs a query with a server-side cursor and yields the result as DataFrames of chunk_rows rows.
+
+        Only one chunk is held client-side at a time, so a SELECT over millions
+        of rows runs in bounded memory. A result with no rows yields one empty
+        DataFrame with its columns; a statement that returns no result set
+        (DDL/DML) yields nothing and is committed, except inside pinned(),
+        which commits once at the end. Unlike execute_query, errors
+        are raised to the caller. The pooled connection stays checked out
+        until the iterator is exhausted or closed.
+
+        A watch (execution_guard.StatementWatch) is given the server
+        connection id so it can kill the query on timeout or cancellation,
+        and checks the row count after every chunk.
+        """
+        if not self.engine and not self.connect():
+            raise ConnectionError(f"Could not connect to {self.connection_config['database']}")
+        chunk_rows = chunk_rows or self.chunk_rows
+
+        pinned = self.pinned_connection is not None
+        checkout = nullcontext(self.pinned_connection) if pinned else self.registry.connect(self.engine)
+        with checkout as conn:
+            if watch is not None:
+                # Only MySQL can kill one statement from another connection
+                connection_id = conn.exec_driver_sql("SELECT CONNECTION_ID()").scalar() \
+                    if conn.dialect.name == 'mysql' else None
+                watch.start(connection_id, lambda: self.kill_query(connection_id))
+            try:
+                if watch is not None:
+                    # A cancel before the statement runs has nothing to kill yet: refuse it here
+                    watch.check(0)
+                # stream_results makes the pymysql dialect use an unbuffered SSCursor
+                conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+                if params:
+                    result = conn.execute(text(query), params)
+                else:
+                    # Raw driver SQL like pd.read_sql(query, ...): colons in literals are not bind parameters
+                    result = conn.exec_driver_sql(query)
+                if watch is not None:
+                    watch.check(0)
+
+                if not result.returns_rows:
+                    if not pinned:
+                        conn.commit()
+                    return
+                columns = list(result.keys())
+                total = 0
+                while True:
+                    rows = result.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    if watch is not None:
+                        watch.check(total)
+                    yield rows_frame(rows, columns)
+                if not total:
+                    yield pd.DataFrame(columns=columns)
+                if not pinned:
+                    conn.commit()
+            finally:
+                if watch is not None:
+                    watch.stop()
+
     def prepare_documents(self, df, content_column, metadata_columns=None):
         """
         Prepare documents from DataFrame
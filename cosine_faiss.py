@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+
+def normalize_vectors(vectors) -> np.ndarray:
+    """ L2-normalizes a batch of vectors in one pass into a C-contiguous float32 array """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Leave all-zero vectors as they are instead of dividing by zero
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def mmr_select(query_scores: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Maximal marginal relevance over normalized candidates.
+
+    query_scores are the cosine scores the index search already returned, so
+    only the candidate-candidate similarities are computed here.
+    """
+    if len(query_scores) == 0 or k <= 0:
+        return []
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(query_scores))]
+    redundancy = pairwise[:, selected[0]].copy()
+
+    while len(selected) < min(k, len(query_scores)):
+        mmr = lambda_mult * query_scores - (1 - lambda_mult) * redundancy
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, pairwise[:, best])
+    return selected
+
+
+class CosineFAISS(FAISS):
+    """
+    FAISS store for cosine similarity over an inner-product index.
+
+    Document and query vectors are L2-normalized with NumPy before they reach
+    the index, so inner-product scores are cosine similarities in [-1, 1] and
+    score_threshold means what it says. MMR re-ranking reuses the scores from
+    the index search and honours score_threshold; when no candidate reaches
+    it, the unfiltered candidates are used so the caller still gets top-k
+    context instead of none.
+    """
+
+    def __init__(self, embedding_function, index, docstore, index_to_docstore_id, **kwargs):
+        kwargs.setdefault('distance_strategy', DistanceStrategy.MAX_INNER_PRODUCT)
+        kwargs.setdefault('relevance_score_fn', lambda score: score)
+        super().__init__(embedding_function, index, docstore, index_to_docstore_id, **kwargs)
+
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        return normalize_vectors(super()._embed_documents(texts))
+
+    async def _aembed_documents(self, texts: List[str]) -> np.ndarray:
+        return normalize_vectors(await super()._aembed_documents(texts))
+
+    def _embed_query(self, text: str) -> np.ndarray:
+        return normalize_vectors(super()._embed_query(text))[0]
+
+    async def _aembed_query(self, text: str) -> np.ndarray:
+        return normalize_vectors(await super()._aembed_query(text))[0]
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        *,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        if filter is not None:
+            docs_and_scores = super().max_marginal_relevance_search_with_score_by_vector(
+                embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter
+            )
+            if score_threshold is not None:
+                docs_and_scores = [(doc, score) for doc, score in docs_and_scores if score >= score_threshold] \
+                    or docs_and_scores
+            return docs_and_scores
+
+        scores, indices = self.index.search(normalize_vectors(embedding), fetch_k)
+        found = indices[0] != -1
+        positions, scores = indices[0][found], scores[0][found]
+        if score_threshold is not None:
+            above = scores >= score_threshold
+            # Fall back to the top-k by similarity rather than returning no context
+            if above.any():
+                positions, scores = positions[above], scores[above]
+        if len(positions) == 0:
+            return []
+
+        candidates = np.vstack([self.index.reconstruct(int(position)) for position in positions])
+        docs_and_scores = []
+        for i in mmr_select(scores, candidates, k, lambda_mult):
+            doc_id = self.index_to_docstore_id[int(positions[i])]
+            doc = self.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            docs_and_scores.append((doc, float(scores[i])))
+        return docs_and_scores
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        docs_and_scores = self.max_marginal_relevance_search_with_score_by_vector(
+            embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter,
+            score_threshold=kwargs.get('score_threshold')
+        )
+        return [doc for doc, _ in docs_and_scores]
@@ -0,0 +1,109 @@
+import json
+import mmap
+import os
+from typing import Dict, List, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+DOCS_FILE = 'docs.bin'
+OFFSETS_FILE = 'docs.offsets.npy'
+IDS_FILE = 'docs.ids.json'
+
+
+def write_docstore(folder: str, docstore: Docstore, index_to_docstore_id: Dict[int, str]) -> None:
+    """
+    Writes documents in FAISS index order as one UTF-8 blob plus an offsets array.
+
+    Row i of the files is the document behind FAISS vector i, so the position to
+    ID mapping is stored once as a plain list instead of a pickled dict.
+    """
+    os.makedirs(folder, exist_ok=True)
+    ids = [index_to_docstore_id[i] for i in range(len(index_to_docstore_id))]
+    offsets = np.zeros(len(ids) + 1, dtype=np.uint64)
+
+    with open(os.path.join(folder, DOCS_FILE), 'wb') as f:
+        position = 0
+        for row, doc_id in enumerate(ids):
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            record = json.dumps(
+                {'page_content': doc.page_content, 'metadata': doc.metadata},
+                ensure_ascii=False, default=str
+            ).encode('utf-8')
+            f.write(record)
+            position += len(record)
+            offsets[row + 1] = position
+
+    np.save(os.path.join(folder, OFFSETS_FILE), offsets)
+    with open(os.path.join(folder, IDS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(ids, f)
+
+
+def has_docstore(folder: str) -> bool:
+    return all(os.path.exists(os.path.join(folder, name)) for name in (DOCS_FILE, OFFSETS_FILE, IDS_FILE))
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """
+    Read-mostly docstore backed by a memory-mapped blob and offsets array.
+
+    Nothing is deserialized at load time except the ID list; a Document is
+    only built when the retriever asks for it (the top-k hits). Adds and
+    deletes from incremental rebuilds go to an in-memory overlay and are
+    folded into the files the next time the store is written.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        with open(os.path.join(folder, IDS_FILE), 'r', encoding='utf-8') as f:
+            self.ids: List[str] = json.load(f)
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.offsets = np.load(os.path.join(folder, OFFSETS_FILE), mmap_mode='r')
+
+        self.file = open(os.path.join(folder, DOCS_FILE), 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        # mmap cannot map an empty file
+        self.blob = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        self.added: Dict[str, Document] = {}
+        self.deleted = set()
+
+    def index_to_docstore_id(self) -> Dict[int, str]:
+        return dict(enumerate(self.ids))
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self.added:
+            return self.added[search]
+        row = self.rows.get(search)
+        if row is None or search in self.deleted:
+            return f"ID {search} not found."
+
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        record = json.loads(bytes(self.blob[start:end]).decode('utf-8'))
+        return Document(page_content=record['page_content'], metadata=record['metadata'])
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = [doc_id for doc_id in texts if isinstance(self.search(doc_id), Document)]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for doc_id, doc in texts.items():
+            self.deleted.discard(doc_id)
+            self.added[doc_id] = doc
+
+    def delete(self, ids: List) -> None:
+        for doc_id in ids:
+            if doc_id not in self.added and (doc_id not in self.rows or doc_id in self.deleted):
+                raise ValueError(f"Tried to delete ids that does not exist: {doc_id}")
+        for doc_id in ids:
+            self.added.pop(doc_id, None)
+            if doc_id in self.rows:
+                self.deleted.add(doc_id)
+
+    def close(self) -> None:
+        if isinstance(self.blob, mmap.mmap):
+            self.blob.close()
+        self.file.close()
+        # Drops the offsets memmap, the last handle on the version folder's files
+        self.offsets = None
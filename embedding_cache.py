@@ -0,0 +1,178 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    SQLite-backed, content-addressed cache in front of an embedding model.
+
+    Vectors are keyed by sha256(model name + text) and stored as float32 blobs.
+    The cache is bounded to max_entries; the least recently used rows are
+    evicted once it grows past that size. Hits only refresh a row's
+    last_used when it is older than touch_interval, and those updates are
+    written with the next store() (or once touch_batch are pending), so
+    reads do not commit to SQLite.
+
+    Query vectors stay out of the SQLite cache: one-off questions would push
+    document vectors out of the LRU and put a write on the query path. They
+    are kept in a small in-memory LRU instead, which also serves the second
+    embedding of the same question within a request (answer cache, retriever).
+    """
+
+    def __init__(self, embedding: Embeddings, model_name: str,
+                 path: str = os.path.join('cache', 'embeddings.sqlite'),
+                 max_entries: int = 100_000, query_cache_size: int = 256,
+                 touch_interval: float = 3600, touch_batch: int = 1000):
+        """
+        Args:
+            embedding (Embeddings): The underlying embedding model (e.g. OllamaEmbeddings)
+            model_name (str): Part of the cache key, so switching models never returns stale vectors
+            path (str): SQLite database file
+            max_entries (int): LRU bound on the number of cached vectors
+            query_cache_size (int): Query vectors kept in memory
+            touch_interval (float): Seconds before a hit refreshes a row's last_used again
+            touch_batch (int): Pending last_used updates that are written without waiting for store()
+        """
+        self.embedding = embedding
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.query_cache_size = query_cache_size
+        self.touch_interval = touch_interval
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.query_hits = 0
+        self.query_misses = 0
+        self.lock = threading.Lock()
+        self.queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        # key -> last_used waiting to be written
+        self.touched: Dict[str, float] = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.db.commit()
+
+    def cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def lookup(self, keys: List[str]) -> dict:
+        found = {}
+        now = time.time()
+        with self.lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.db.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    if last_used < now - self.touch_interval:
+                        self.touched[key] = now
+            if len(self.touched) >= self.touch_batch:
+                self.flush_touched()
+                self.db.commit()
+        return found
+
+    def flush_touched(self) -> None:
+        """ Writes pending last_used updates (caller holds the lock and commits) """
+        if self.touched:
+            self.db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self.touched.items()]
+            )
+            self.touched.clear()
+
+    def store(self, items: dict) -> None:
+        now = time.time()
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+            )
+            # Hits count as recent before anything is evicted
+            self.flush_touched()
+            self.evict()
+            self.db.commit()
+
+    def evict(self) -> None:
+        """ Drops the least recently used rows beyond max_entries (caller holds the lock) """
+        (count,) = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache_key(text) for text in texts]
+        cached = self.lookup(list(set(keys)))
+
+        # Embed each distinct missing text once, even if it repeats in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        with self.lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(self.embedding.embed_documents(list(missing.values())), dtype=np.float32)
+            # Round-trip through float32 so hits and misses return identical vectors
+            new_items = dict(zip(missing.keys(), vectors.tolist()))
+            self.store(new_items)
+            cached.update(new_items)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache_key(text)
+        with self.lock:
+            vector = self.queries.get(key)
+            if vector is not None:
+                self.queries.move_to_end(key)
+                self.query_hits += 1
+                return vector
+            self.query_misses += 1
+
+        vector = np.asarray(self.embedding.embed_query(text), dtype=np.float32).tolist()
+        with self.lock:
+            self.queries[key] = vector
+            while len(self.queries) > self.query_cache_size:
+                self.queries.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        with self.lock:
+            (entries,) = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'max_entries': self.max_entries,
+                'query_hits': self.query_hits, 'query_misses': self.query_misses}
+
+    def close(self) -> None:
+        with self.lock:
+            self.flush_touched()
+            self.db.commit()
+            self.db.close()
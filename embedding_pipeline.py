@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List
+from langchain_core.embeddings import Embeddings
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embedding stage that batches texts and keeps several requests in flight.
+
+    Batches are submitted to a thread pool while at most
+    max_in_flight + queue_size of them are pending, so a slow embedding
+    server pushes back on the producer instead of queueing the whole corpus.
+    Failed batches are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, embedding: Embeddings, batch_size: int = 32, max_in_flight: int = 4,
+                 queue_size: int = 8, max_retries: int = 3, retry_backoff: float = 0.5):
+        """
+        Args:
+            embedding (Embeddings): The underlying embedding model (e.g. OllamaEmbeddings)
+            batch_size (int): Texts per embedding request
+            max_in_flight (int): Concurrent embedding requests
+            queue_size (int): Extra batches allowed to wait behind the in-flight ones
+            max_retries (int): Retries per batch before the error is raised
+            retry_backoff (float): Base delay in seconds, doubled per attempt
+        """
+        self.embedding = embedding
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed")
+        self.lock = threading.Lock()
+        self.total_embedded = 0
+        self.total_seconds = 0.0
+        self.retries = 0
+
+    def embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embedding.embed_documents(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"--Embedding batch failed ({e}), retrying in {delay:.2f}s")
+                with self.lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def embed_iter(self, texts: Iterable[str]) -> Iterator[List[float]]:
+        """ Yields one vector per input text, in input order, reading the input lazily """
+        texts = iter(texts)
+        pending = deque()
+        exhausted = False
+
+        while True:
+            # Backpressure: only pull more input while the pending window has room
+            while not exhausted and len(pending) < self.max_in_flight + self.queue_size:
+                batch = list(islice(texts, self.batch_size))
+                if not batch:
+                    exhausted = True
+                    break
+                pending.append(self.executor.submit(self.embed_batch, batch))
+
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start_time = time.time()
+        vectors = list(self.embed_iter(texts))
+        elapsed = time.time() - start_time
+
+        with self.lock:
+            self.total_embedded += len(vectors)
+            self.total_seconds += elapsed
+        if vectors and elapsed > 0:
+            print(f"⚡ Embedded {len(vectors)} texts in {elapsed:.2f}s "
+                  f"({len(vectors) / elapsed:.1f} embeddings/sec, batch_size={self.batch_size}, "
+                  f"in_flight={self.max_in_flight})")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding.embed_query(text)
+
+    def stats(self) -> dict:
+        with self.lock:
+            rate = self.total_embedded / self.total_seconds if self.total_seconds else 0.0
+            return {
+                'embedded': self.total_embedded,
+                'seconds': round(self.total_seconds, 2),
+                'embeddings_per_sec': round(rate, 1),
+                'retries': self.retries,
+                'batch_size': self.batch_size,
+                'max_in_flight': self.max_in_flight
+            }
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_POOL_OPTIONS = {
+    'pool_size': 5,         # connections kept open per database
+    'max_overflow': 10,     # extra connections opened under burst load, closed when returned
+    'pool_timeout': 30,     # seconds a checkout waits for a free connection before failing
+    'pool_recycle': 1800,   # seconds before a connection is replaced (below MySQL/proxy idle timeouts)
+    'pool_pre_ping': True   # test connections on checkout so a dropped one is replaced transparently
+}
+
+
+class PoolMetrics:
+    """ Checkout counters and wait times of one engine's pool """
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        # pool_size + max_overflow the engine was created with
+        self.capacity = capacity
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self.lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self) -> None:
+        with self.lock:
+            self.timeouts += 1
+
+    def attach(self, engine: Engine) -> None:
+        """ Counts new DBAPI connections and invalidated ones (failed pre-ping, dropped by the server) """
+        def on_connect(*_):
+            with self.lock:
+                self.connects += 1
+
+        def on_invalidate(*_):
+            with self.lock:
+                self.invalidations += 1
+
+        event.listen(engine.pool, 'connect', on_connect)
+        event.listen(engine.pool, 'invalidate', on_invalidate)
+
+
+class EngineRegistry:
+    """
+    Process-wide SQLAlchemy engines, one per connection config.
+
+    Every MySQLConnection for the same host/port/user/database shares one
+    engine and its QueuePool, so API calls reuse open connections instead
+    of paying TCP, auth and a probe query each time. pool_pre_ping and
+    pool_recycle keep long-lived connections healthy; stats() reports pool
+    utilization and checkout waits for sizing pool_size/max_overflow.
+    """
+
+    def __init__(self, **pool_options):
+        """
+        Args:
+            pool_options: pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping (see DEFAULT_POOL_OPTIONS)
+        """
+        self.pool_options = dict(DEFAULT_POOL_OPTIONS)
+        self.engines: Dict[Tuple, Engine] = {}
+        self.metrics: Dict[Tuple, PoolMetrics] = {}
+        self.lock = threading.Lock()
+        self.configure(**pool_options)
+
+    def configure(self, **pool_options) -> None:
+        """ Updates the pool options; engines created before keep the options they were created with """
+        self.pool_options.update({key: value for key, value in pool_options.items() if value is not None})
+
+    @staticmethod
+    def key(connection_config: Dict) -> Tuple:
+        # The password is part of the key (hashed) so changed credentials get a new engine
+        password = hashlib.sha256(str(connection_config.get('password', '')).encode('utf-8')).hexdigest()[:16]
+        return (
+            connection_config.get('host', 'localhost'),
+            int(connection_config.get('port', 3306)),
+            connection_config.get('user'),
+            connection_config.get('database'),
+            password
+        )
+
+    @staticmethod
+    def url(connection_config: Dict) -> str:
+        return (f"mysql+pymysql://{connection_config.get('user')}:{connection_config.get('password')}"
+                f"@{connection_config.get('host', 'localhost')}:{int(connection_config.get('port', 3306))}"
+                f"/{connection_config.get('database')}")
+
+    def get(self, connection_config: Dict) -> Engine:
+        """ Shared engine for the config, created (and probed once with SELECT 1) on first use """
+        key = self.key(connection_config)
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is not None:
+                return engine
+
+            engine = create_engine(self.url(connection_config), echo=False, poolclass=QueuePool, **self.pool_options)
+            metrics = PoolMetrics(self.pool_options['pool_size'] + self.pool_options['max_overflow'])
+            metrics.attach(engine)
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception:
+                engine.dispose()
+                raise
+            self.engines[key] = engine
+            self.metrics[key] = metrics
+            print(f"Created connection pool for {key[3]}@{key[0]}:{key[1]} "
+                  f"(size {self.pool_options['pool_size']}, overflow {self.pool_options['max_overflow']})")
+            return engine
+
+    def metrics_for(self, engine: Engine) -> Optional[PoolMetrics]:
+        for key, known in self.engines.items():
+            if known is engine:
+                return self.metrics[key]
+        return None
+
+    @contextmanager
+    def connect(self, engine: Engine) -> Iterator[Connection]:
+        """ Checks a connection out of the engine's pool, recording how long the checkout waited """
+        metrics = self.metrics_for(engine)
+        start = time.perf_counter()
+        try:
+            conn = engine.connect()
+        except PoolTimeout:
+            if metrics:
+                metrics.record_timeout()
+            raise
+        if metrics:
+            metrics.record_wait(time.perf_counter() - start)
+        with conn:
+            yield conn
+
+    def stats(self) -> Dict:
+        pools = []
+        for key, engine in list(self.engines.items()):
+            pool, metrics = engine.pool, self.metrics[key]
+            checked_out = pool.checkedout()
+            with metrics.lock:
+                pools.append({
+                    'database': key[3],
+                    'server': f"{key[0]}:{key[1]}",
+                    'pool_size': pool.size(),
+                    'checked_out': checked_out,
+                    'idle': pool.checkedin(),
+                    'overflow': max(pool.overflow(), 0),
+                    'utilization': round(checked_out / metrics.capacity, 2) if metrics.capacity else 0.0,
+                    'checkouts': metrics.checkouts,
+                    'checkout_timeouts': metrics.timeouts,
+                    'avg_checkout_wait_ms': round(metrics.wait_total / metrics.checkouts * 1000, 2) if metrics.checkouts else 0.0,
+                    'max_checkout_wait_ms': round(metrics.wait_max * 1000, 2),
+                    'connections_opened': metrics.connects,
+                    'connections_invalidated': metrics.invalidations
+                })
+        return {'options': dict(self.pool_options), 'pools': pools}
+
+    def dispose_all(self) -> None:
+        with self.lock:
+            for engine in self.engines.values():
+                engine.dispose()
+            self.engines.clear()
+            self.metrics.clear()
+
+
+# Shared by every MySQLConnection in the process
+engines = EngineRegistry()
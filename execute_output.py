@@ -1,14 +1,82 @@
 import os
 import sqlparse
 from connect_alchemy import MySQLConnection
-from typing import Dict, List
+from result_stream import ColumnStats, HeadTail, RecordsSink, consume
+from result_store import ResultStore
+from execution_planner import ExecutionPlanner
+from execution_guard import ExecutionGuard, ScriptRun, StatementCancelled
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
-from datetime import datetime
 
 class ExecuteOutput:
-    def __init__(self, script_filename: str):
+    def __init__(self, script_filename: str, chunk_rows: int = 10_000,
+                 result_store: Optional[ResultStore] = None, preview_rows: int = 100, max_parallel: int = 4,
+                 guard: Optional[ExecutionGuard] = None, run: Optional[ScriptRun] = None):
         self.script_filename = script_filename
         self.script_path = os.path.join('results', script_filename)
+        # Results are fetched with a server-side cursor, chunk_rows rows at a time
+        self.chunk_rows = chunk_rows
+        # Responses carry the first preview_rows rows; the full result is spilled to result_store
+        self.result_store = result_store or ResultStore()
+        self.preview_rows = preview_rows
+        # Read-only statements run up to max_parallel at a time on pooled connections
+        self.planner = ExecutionPlanner(max_parallel=max_parallel)
+        # Time limit, row cap and EXPLAIN pre-flight per statement; run carries the cancel flag
+        self.guard = guard or ExecutionGuard()
+        self.run = run
+    
+    def read_statements(self) -> List[Tuple[int, str]]:
+        """ (position, statement) for every statement of the script, skipping empty and comment lines """
+        with open(self.script_path, 'r', encoding='utf-8') as file:
+            script_content = file.read()
+        
+        # Parse SQL statements
+        statements = [(i, stmt.strip()) for i, stmt in enumerate(sqlparse.split(script_content), 1)]
+        return [(i, cleaned) for i, cleaned in statements if cleaned and not cleaned.startswith('--')]
+    
+    def guarded_stream(self, conn: MySQLConnection, cleaned: str, watch):
+        """ Refuses cancelled or over-limit statements, then streams the statement's chunks under watch """
+        if self.run is not None and self.run.cancelled:
+            raise StatementCancelled("Cancelled before it started")
+        self.guard.preflight(conn, cleaned)
+        return conn.stream_query(cleaned, chunk_rows=self.chunk_rows, watch=watch)
+    
+    def capture_statement(self, conn: MySQLConnection, i: int, cleaned: str) -> Dict:
+        """ Runs one statement and returns its API result (runs on planner worker threads) """
+        watch = self.guard.watch(self.run)
+        try:
+            # Preview, column stats and the spill file are filled chunk by chunk as rows stream in
+            result_id = self.result_store.new_id(i)
+            preview, stats = RecordsSink(limit=self.preview_rows), ColumnStats()
+            row_count = consume(
+                self.guarded_stream(conn, cleaned, watch),
+                preview, stats, self.result_store.spill(result_id)
+            )
+
+            if row_count:
+                return {
+                    'query': cleaned,
+                    'result': preview.records,
+                    'row_count': row_count,
+                    'preview_rows': len(preview.records),
+                    'truncated': row_count > len(preview.records),
+                    'columns': stats.to_list(),
+                    'result_id': result_id,
+                    'success': True
+                }
+            return {
+                'query': cleaned,
+                'result': 'Query executed successfully (no data returned)',
+                'row_count': 0,
+                'success': True
+            }
+        except Exception as e:
+            # A killed query fails with the driver's "interrupted" error; report why it was killed
+            return {
+                'query': cleaned,
+                'error': watch.reason or str(e),
+                'success': False
+            }
     
     def execute_and_capture_results(self, db_config: Dict) -> List[Dict]:
         """Execute script and capture results for API response"""
@@ -19,43 +87,12 @@ class ExecuteOutput:
         results = []
         
         try:
-            with open(self.script_path, 'r', encoding='utf-8') as file:
-                script_content = file.read()
-            
-            # Parse SQL statements
-            statements = sqlparse.split(script_content)
-            
-            for stmt in statements:
-                cleaned = stmt.strip()
-                if cleaned and not cleaned.startswith('--'):  # Skip empty and comment lines
-                    try:
-                        result = conn.execute_query(cleaned)
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-                        # Create filename
-                        filename = f"outputs/result_{timestamp}.csv"
-                        result.to_csv(filename, index=False)
-
-                        if result is not None and not result.empty:
-                            results.append({
-                                'query': cleaned,
-                                'result': result.to_dict('records'),
-                                'row_count': len(result),
-                                'success': True
-                            })
-                        else:
-                            results.append({
-                                'query': cleaned,
-                                'result': 'Query executed successfully (no data returned)',
-                                'row_count': 0,
-                                'success': True
-                            })
-                    except Exception as e:
-                        results.append({
-                            'query': cleaned,
-                            'error': str(e),
-                            'success': False
-                        })
+            statements = self.read_statements()
+            # Independent read-only checks run concurrently; results come back in script order
+            for _, result in self.planner.run(
+                statements, lambda i, cleaned: self.capture_statement(conn, i, cleaned), pin=conn.pinned
+            ):
+                results.append(result)
         
         except Exception as e:
             results.append({
@@ -68,6 +105,33 @@ class ExecuteOutput:
         
         return results
     
+    def format_statement(self, conn: MySQLConnection, i: int, cleaned: str) -> str:
+        """ Runs one statement and returns its console report, printed later in script order """
+        lines = [f"\n📝 Query {i}:", cleaned, "-" * 40]
+        watch = self.guard.watch(self.run)
+        try:
+            # Only the first 10 and last 5 rows are kept while the result streams past
+            preview = HeadTail(head=10, tail=5)
+            row_count = consume(self.guarded_stream(conn, cleaned, watch), preview)
+            
+            if row_count:
+                lines.append(f"✅ Success! ({row_count} rows)")
+                if row_count <= 10:  # Show all rows if 10 or fewer
+                    lines.append(preview.head.to_string(index=False))
+                else:  # Show first 5 and last 5 if more than 10
+                    lines.append("First 5 rows:")
+                    lines.append(preview.head.head().to_string(index=False))
+                    lines.append("...")
+                    lines.append("Last 5 rows:")
+                    lines.append(preview.tail_frame().to_string(index=False))
+                    lines.append(f"({row_count} total rows)")
+            else:
+                lines.append("✅ Query executed successfully (no data returned)")
+        
+        except Exception as e:
+            lines.append(f"❌ Error: {watch.reason or str(e)}")
+        return "\n".join(lines)
+    
     def execute_final(self, db_config: Dict):
         """Execute script and print results to console (original functionality)"""
         if not os.path.exists(self.script_path):
@@ -77,41 +141,15 @@ class ExecuteOutput:
         conn = MySQLConnection(**db_config)
         
         try:
-            with open(self.script_path, 'r', encoding='utf-8') as file:
-                script_content = file.read()
+            statements = self.read_statements()
             
             print(f"\n🚀 Executing script: {self.script_filename}")
             print("=" * 60)
             
-            # Parse SQL statements
-            statements = sqlparse.split(script_content)
-            
-            for i, stmt in enumerate(statements, 1):
-                cleaned = stmt.strip()
-                if cleaned and not cleaned.startswith('--'):  # Skip empty and comment lines
-                    print(f"\n📝 Query {i}:")
-                    print(cleaned)
-                    print("-" * 40)
-                    
-                    try:
-                        result = conn.execute_query(cleaned)
-                        
-                        if result is not None and not result.empty:
-                            print(f"✅ Success! ({len(result)} rows)")
-                            if len(result) <= 10:  # Show all rows if 10 or fewer
-                                print(result.to_string(index=False))
-                            else:  # Show first 5 and last 5 if more than 10
-                                print("First 5 rows:")
-                                print(result.head().to_string(index=False))
-                                print("...")
-                                print("Last 5 rows:")
-                                print(result.tail().to_string(index=False))
-                                print(f"({len(result)} total rows)")
-                        else:
-                            print("✅ Query executed successfully (no data returned)")
-                    
-                    except Exception as e:
-                        print(f"❌ Error: {str(e)}")
+            for _, report in self.planner.run(
+                statements, lambda i, cleaned: self.format_statement(conn, i, cleaned), pin=conn.pinned
+            ):
+                print(report)
         
         except Exception as e:
             print(f"❌ Error reading script file: {str(e)}")
@@ -0,0 +1,250 @@
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+
+# Leading keywords of statements MySQL can EXPLAIN
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class GuardViolation(Exception):
+    """ A statement was refused before it ran or stopped while it ran by an execution guard """
+
+
+class StatementCancelled(GuardViolation):
+    """ The script run was cancelled """
+
+
+class ScriptRun:
+    """
+    One running script: its cancel flag and the watches of its running statements.
+
+    cancel() sets the flag, which stops statements that have not started yet,
+    and kills the queries of the ones that are running.
+    """
+
+    def __init__(self, kind: str, run_id: Optional[str] = None):
+        self.id = run_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.watches: List['StatementWatch'] = []
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self) -> bool:
+        """ Returns False if the run already finished """
+        if self.finished_at is not None:
+            return False
+        self.cancel_event.set()
+        with self.lock:
+            watches = list(self.watches)
+        for watch in watches:
+            watch.stop_query("Cancelled")
+        return True
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            running = len(self.watches)
+        end = self.finished_at or time.time()
+        return {
+            'run_id': self.id,
+            'kind': self.kind,
+            'status': 'cancelled' if self.cancelled else ('finished' if self.finished_at else 'running'),
+            'running_statements': running,
+            'elapsed_seconds': round(end - self.started_at, 2)
+        }
+
+
+class StatementWatch:
+    """
+    Enforces the time limit, row cap and cancellation on one running statement.
+
+    MySQLConnection.stream_query calls start() with the statement's server
+    connection id and a kill function before it runs, check() before and
+    after executing it and after every fetched chunk, and stop() when it is
+    done. A timer kills the query (KILL QUERY) when it outlives
+    timeout_seconds; the row cap and cancellation also kill it, so an
+    unbuffered cursor is not drained. Kills run under the watch's lock and
+    none is sent once stop() returned, when the connection may already be
+    back in the pool serving another request.
+    """
+
+    def __init__(self, run: Optional[ScriptRun], timeout_seconds: Optional[float], max_rows: Optional[int]):
+        self.run = run
+        self.timeout_seconds = timeout_seconds
+        self.max_rows = max_rows
+        self.kill: Optional[Callable[[], None]] = None
+        self.timer: Optional[threading.Timer] = None
+        # Why the statement was stopped, reported instead of the driver's "query interrupted" error
+        self.reason: Optional[str] = None
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def start(self, connection_id: Optional[int], kill: Callable[[], None]) -> None:
+        with self.lock:
+            self.kill = kill if connection_id is not None else None
+        if self.run is not None:
+            with self.run.lock:
+                self.run.watches.append(self)
+            if self.run.cancelled:
+                # Nothing runs yet, so nothing to kill: check() refuses the statement
+                with self.lock:
+                    self.reason = self.reason or "Cancelled"
+        if self.timeout_seconds:
+            self.timer = threading.Timer(
+                self.timeout_seconds, self.stop_query,
+                args=(f"Exceeded the execution time limit of {self.timeout_seconds:g}s",)
+            )
+            self.timer.daemon = True
+            self.timer.start()
+
+    def stop_query(self, reason: str) -> None:
+        """
+        Records why the statement stops (the first reason wins) and kills its
+        query on the server, from any thread. The kill is sent even when a
+        reason is already recorded: a cancel that landed just before the
+        statement started found nothing to kill, and the time limit must
+        still stop it.
+        """
+        with self.lock:
+            if self.stopped:
+                return
+            if self.reason is None:
+                self.reason = reason
+            if self.kill is not None:
+                try:
+                    self.kill()
+                except Exception as e:
+                    print(f"--Error killing query: {e}")
+
+    def check(self, rows: int) -> None:
+        if self.reason is None and self.max_rows is not None and rows > self.max_rows:
+            self.stop_query(f"Stopped after more than {self.max_rows} rows (row cap)")
+        if self.reason is not None:
+            raise (StatementCancelled if self.reason == "Cancelled" else GuardViolation)(self.reason)
+
+    def stop(self) -> None:
+        """ Called before the connection is released: waits for a kill in progress and prevents later ones """
+        with self.lock:
+            self.stopped = True
+            self.kill = None
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.run is not None:
+            with self.run.lock:
+                if self in self.run.watches:
+                    self.run.watches.remove(self)
+
+
+class ExecutionGuard:
+    """
+    Resource guards for generated scripts.
+
+    preflight() runs EXPLAIN and refuses statements whose plan scans more
+    than explain_max_scan_rows rows of one table without an index, or
+    whose joins multiply out to more than explain_max_join_rows estimated
+    rows (e.g. a cartesian join of source and target tables). watch()
+    returns the per-statement time limit / row cap / cancellation watch.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = 300, max_rows: Optional[int] = 1_000_000,
+                 explain_max_scan_rows: Optional[int] = 5_000_000,
+                 explain_max_join_rows: Optional[int] = 100_000_000):
+        """
+        Args:
+            timeout_seconds (float): Wall time after which a statement's query is killed, None for no limit
+            max_rows (int): Rows a statement may return before it is stopped, None for no cap
+            explain_max_scan_rows (int): Largest estimated full table scan allowed, None to skip the check
+            explain_max_join_rows (int): Largest estimated join product allowed, None to skip the check
+        """
+        self.timeout_seconds = timeout_seconds
+        self.max_rows = max_rows
+        self.explain_max_scan_rows = explain_max_scan_rows
+        self.explain_max_join_rows = explain_max_join_rows
+
+    def watch(self, run: Optional[ScriptRun] = None) -> StatementWatch:
+        return StatementWatch(run, self.timeout_seconds, self.max_rows)
+
+    @staticmethod
+    def explainable(statement: str) -> bool:
+        words = statement.lstrip('( \n\t').split(None, 1)
+        return bool(words) and words[0].upper() in EXPLAINABLE
+
+    def preflight(self, conn, statement: str) -> None:
+        """ Raises GuardViolation when the statement's EXPLAIN plan is over the limits """
+        if (self.explain_max_scan_rows is None and self.explain_max_join_rows is None) \
+                or not self.explainable(statement):
+            return
+        try:
+            plan = pd.concat(list(conn.stream_query(f"EXPLAIN {statement}")))
+        except Exception as e:
+            # No plan (e.g. not MySQL); the statement itself reports any real error
+            print(f"--Error running EXPLAIN pre-flight, skipping it: {e}")
+            return
+        self.check_plan(plan)
+
+    def check_plan(self, plan: pd.DataFrame) -> None:
+        if plan.empty or 'rows' not in plan.columns:
+            return
+        plan = plan.assign(rows=pd.to_numeric(plan['rows'], errors='coerce').fillna(0))
+
+        if self.explain_max_scan_rows is not None and 'type' in plan.columns:
+            scans = plan[(plan['type'].astype(str).str.upper() == 'ALL') & (plan['rows'] > self.explain_max_scan_rows)]
+            if not scans.empty:
+                worst = scans.sort_values('rows').iloc[-1]
+                raise GuardViolation(
+                    f"Refused by EXPLAIN pre-flight: full scan of {worst.get('table', '?')} "
+                    f"(~{int(worst['rows'])} rows) exceeds {self.explain_max_scan_rows}"
+                )
+
+        if self.explain_max_join_rows is not None:
+            # Rows of one SELECT are joined: their estimates multiply (scaled by the filtered %)
+            filtered = pd.to_numeric(plan['filtered'], errors='coerce').fillna(100) / 100 \
+                if 'filtered' in plan.columns else 1.0
+            plan = plan.assign(effective=(plan['rows'] * filtered).clip(lower=1))
+            groups = plan.groupby('id') if 'id' in plan.columns else [(None, plan)]
+            estimate = max(math.prod(group['effective']) for _, group in groups)
+            if estimate > self.explain_max_join_rows:
+                raise GuardViolation(
+                    f"Refused by EXPLAIN pre-flight: estimated join size ~{int(estimate)} rows "
+                    f"exceeds {self.explain_max_join_rows}"
+                )
+
+
+class ScriptRunRegistry:
+    """ Running and recently finished script runs, for the cancel endpoint """
+
+    def __init__(self, keep_finished: int = 50):
+        self.keep_finished = keep_finished
+        self.runs: "OrderedDict[str, ScriptRun]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def start(self, kind: str, run_id: Optional[str] = None) -> ScriptRun:
+        run = ScriptRun(kind, run_id)
+        with self.lock:
+            self.runs[run.id] = run
+            finished = [key for key, known in self.runs.items() if known.finished_at is not None]
+            for key in finished[:max(len(finished) - self.keep_finished, 0)]:
+                del self.runs[key]
+        return run
+
+    def finish(self, run: ScriptRun) -> None:
+        run.finished_at = time.time()
+
+    def get(self, run_id: str) -> Optional[ScriptRun]:
+        return self.runs.get(run_id)
+
+    def cancel(self, run_id: str) -> bool:
+        run = self.runs.get(run_id)
+        return run is not None and run.cancel()
+
+    def list(self) -> List[Dict]:
+        return [run.to_dict() for run in reversed(list(self.runs.values()))]
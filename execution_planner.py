@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Iterator, List, Optional, Tuple
+import sqlparse
+
+# Leading keywords of statements that only read
+READ_KEYWORDS = ('SELECT', 'WITH', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN')
+
+# Keywords that make an otherwise read-only statement write or lock (SELECT ... INTO, FOR UPDATE)
+WRITE_KEYWORDS = {
+    'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'MERGE', 'CREATE', 'ALTER', 'DROP', 'TRUNCATE', 'RENAME',
+    'GRANT', 'REVOKE', 'INTO', 'LOCK', 'CALL', 'LOAD', 'HANDLER', 'OPTIMIZE', 'REPAIR', 'FLUSH', 'KILL'
+}
+
+# Statements whose effect lives in the connection, so everything after them must run on the same one
+SESSION_KEYWORDS = ('SET', 'USE', 'BEGIN', 'START', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'LOCK', 'UNLOCK')
+
+READ, WRITE, SESSION = 'read', 'write', 'session'
+
+
+def classify(statement: str) -> str:
+    """
+    'read' for statements that only read, 'write' for anything that may
+    change data (or whose kind is unclear), 'session' for statements that
+    change connection state: SET/USE/transactions, temporary tables and
+    user variables.
+    """
+    parsed = sqlparse.parse(statement)
+    if not parsed:
+        return WRITE
+    tokens = list(parsed[0].flatten())
+    keywords = [token.normalized.upper() for token in tokens if token.is_keyword]
+    if not keywords:
+        return WRITE
+    if keywords[0] in SESSION_KEYWORDS or 'TEMPORARY' in keywords:
+        return SESSION
+    # @name is a user variable (connection state); @@name only reads a system variable
+    if any(token.value.startswith('@') and not token.value.startswith('@@') for token in tokens):
+        return SESSION
+    if keywords[0] in READ_KEYWORDS and not WRITE_KEYWORDS.intersection(keywords):
+        return READ
+    return WRITE
+
+
+class ExecutionPlanner:
+    """
+    Runs the statements of a script with independent reads in parallel.
+
+    Consecutive read-only statements form a group that runs concurrently
+    on up to max_parallel pooled connections; every other statement is a
+    barrier that runs alone, after everything before it and before
+    everything after it, so reads still see the writes that precede them.
+    A script with any session statement runs entirely in order, since its
+    variables, temporary tables and transactions are tied to one connection.
+    Results come back in original statement order.
+    """
+
+    def __init__(self, max_parallel: int = 4):
+        """
+        Args:
+            max_parallel (int): Concurrent read-only statements; keep at or below the DB pool's size + overflow
+        """
+        self.max_parallel = max(1, max_parallel)
+
+    @staticmethod
+    def uses_session(statements: List[Tuple[int, str]]) -> bool:
+        return any(classify(statement) == SESSION for _, statement in statements)
+
+    def plan(self, statements: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """ Splits (index, statement) pairs into groups: read-only runs, single barriers between them """
+        kinds = [classify(statement) for _, statement in statements]
+        if SESSION in kinds or self.max_parallel == 1:
+            return [[item] for item in statements]
+
+        groups, reads = [], []
+        for item, kind in zip(statements, kinds):
+            if kind == READ:
+                reads.append(item)
+                continue
+            if reads:
+                groups.append(reads)
+                reads = []
+            groups.append([item])
+        if reads:
+            groups.append(reads)
+        return groups
+
+    def run(self, statements: List[Tuple[int, str]], execute: Callable[[int, str], object],
+            pin: Optional[Callable[[], ContextManager]] = None) -> Iterator[Tuple[int, object]]:
+        """
+        Yields (index, execute(index, statement)) in statement order, as soon as each is available.
+
+        pin() is entered around a session script, e.g. to keep all its
+        statements on one database connection.
+        """
+        if self.uses_session(statements):
+            print("Script sets session state, running its statements in order on one connection")
+            with (pin() if pin else nullcontext()):
+                for index, statement in statements:
+                    yield index, execute(index, statement)
+            return
+
+        groups = self.plan(statements)
+        parallel = sum(len(group) for group in groups if len(group) > 1)
+        if parallel:
+            print(f"Running {parallel} of {len(statements)} read-only statements concurrently "
+                  f"(up to {self.max_parallel} at a time)")
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="stmt") as executor:
+            for group in groups:
+                if len(group) == 1:
+                    index, statement = group[0]
+                    yield index, execute(index, statement)
+                    continue
+                futures = [(index, executor.submit(execute, index, statement)) for index, statement in group]
+                for index, future in futures:
+                    yield index, future.result()
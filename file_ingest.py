@@ -0,0 +1,134 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from chunking import SEMANTIC_EXTENSIONS
+from incremental_index import DATABASE_KEY
+
+# Prefix of the 'source' metadata of uploaded files, keeping them apart from source_db/target_db documents
+UPLOAD_SOURCE = 'upload'
+
+
+
+def upload_source(name: str) -> str:
+    """ 'source' metadata of an uploaded file; the extension drives EnhancedChunker's splitter choice """
+    return f"{UPLOAD_SOURCE}/{name}"
+
+
+def upload_key(name: str) -> str:
+    """ Manifest key of an uploaded file, equal to incremental_index.document_key of its chunks """
+    return f"{upload_source(name)}:{DATABASE_KEY}"
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_text(path: str, encoding: Optional[str] = None) -> str:
+    """ Reads a file in the encoding the upload store detected, or tries utf-8 then latin-1 """
+    if encoding:
+        with open(path, 'r', encoding=encoding) as f:
+            return f.read()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        print(f"Error reading file {path} as utf-8, retrying with latin-1")
+        with open(path, 'r', encoding='latin-1') as f:
+            return f.read()
+
+
+def file_document(path: str, name: str, digest: str, encoding: Optional[str] = None) -> Document:
+    return Document(page_content=read_text(path, encoding), metadata={
+        'type': 'upload',
+        'source': upload_source(name),
+        'file_name': name,
+        'file_size': os.path.getsize(path),
+        'content_hash': digest
+    })
+
+
+def upload_task(path: str, name: str, digest: Optional[str] = None, encoding: Optional[str] = None) -> Tuple:
+    """ (path, name, sha256, encoding) for an upload, hashing it only when no digest is known """
+    return path, name, digest or file_digest(path), encoding
+
+
+def iter_documents(tasks: List[Tuple]) -> Iterator[Document]:
+    """ Reads upload tasks one at a time, so only the file being chunked is held in memory """
+    for path, name, digest, encoding in tasks:
+        yield file_document(path, name, digest, encoding)
+
+
+def is_semantic(name: str) -> bool:
+    """ Semantic chunking needs the embedding client, so these files are never sent to a worker process """
+    return os.path.splitext(name)[1].lower() in SEMANTIC_EXTENSIONS
+
+
+def number_chunks(chunks: List[Document]) -> List[Document]:
+    for position, chunk in enumerate(chunks):
+        chunk.metadata.update({'chunk_index': position, 'chunk_count': len(chunks)})
+    return chunks
+
+
+class ChunkPool:
+    """
+    Long-lived pool of worker processes for chunk_worker.chunk_file.
+
+    Workers are started with 'spawn', not forked from the Flask process:
+    its other threads (job queue, embedding executor, embedding cache, LLM
+    warm-up) may hold locks a forked child would inherit locked forever.
+    A spawned worker imports chunk_worker fresh, so the pool is created on
+    first use and kept for later uploads rather than paying that start-up
+    per batch. Spawn also works on Windows, where fork does not exist.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def map(self, worker: Callable, tasks: List[Tuple]) -> Iterator:
+        """ Yields worker(task) for every task as each finishes """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            executor = self.executor
+        try:
+            futures = [executor.submit(worker, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time instead of failing every later upload
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+            raise
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+
+
+def pool_worth_it(tasks: List[Tuple], min_bytes: int) -> bool:
+    """ Starting workers and pickling chunks back only pays off for real batches """
+    return len(tasks) > 1 and sum(os.path.getsize(task[0]) for task in tasks) >= min_bytes
+
+
+def split_tasks(tasks: List[Tuple]) -> Tuple[List, List]:
+    """ (pool tasks, in-process semantic tasks) for the given upload tasks """
+    pool_tasks, semantic_tasks = [], []
+    for task in tasks:
+        (semantic_tasks if is_semantic(task[1]) else pool_tasks).append(task)
+    return pool_tasks, semantic_tasks
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import math
+import os
+from typing import Dict, List, Optional, Set
+
+# Key used for documents that do not belong to a table (e.g. database information)
+DATABASE_KEY = '__database__'
+MANIFEST_FILE = 'fingerprints.json'
+MANIFEST_VERSION = 1
+
+
+def document_key(doc) -> str:
+    """ Groups documents/chunks by '<source>:<table>' so a table's vectors can be replaced together """
+    return f"{doc.metadata.get('source', '')}:{doc.metadata.get('table', DATABASE_KEY)}"
+
+
+def row_count_bucket(row_count) -> int:
+    """ log2 bucket so small row-count drift doesn't trigger a re-embed """
+    row_count = int(row_count or 0)
+    return int(math.log2(row_count + 1))
+
+
+def hash_payload(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def table_fingerprint(table: Dict) -> str:
+    """ Fingerprint of a schema_info table: column definitions, FK list and row-count bucket """
+    return hash_payload({
+        'columns': table.get('columns', []),
+        'foreign_keys': table.get('foreign_keys', []),
+        'rows': row_count_bucket(table.get('row_estimate'))
+    })
+
+
+def assign_chunk_ids(chunks: List) -> Dict[str, List]:
+    """
+    Gives every chunk a stable ID ('<source>:<table>:<n>') and groups them by document key.
+
+    Returns:
+        dict: {document_key: [(chunk_id, chunk), ...]}
+    """
+    groups = {}
+    for chunk in chunks:
+        key = document_key(chunk)
+        group = groups.setdefault(key, [])
+        group.append((f"{key}:{len(group)}", chunk))
+    return groups
+
+
+class FingerprintManifest:
+    """ Per-table fingerprints and vector IDs stored next to the FAISS index """
+
+    def __init__(self, db_path: str):
+        self.path = os.path.join(db_path, MANIFEST_FILE)
+        self.entries: Dict[str, Dict] = {}
+
+    def load(self) -> bool:
+        """ Returns False if there is no usable manifest (first build or format change) """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"--Error reading fingerprint manifest: {e}")
+            return False
+        if data.get('version') != MANIFEST_VERSION:
+            return False
+        self.entries = data.get('entries', {})
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def changed(self, key: str, fingerprint: str) -> bool:
+        entry = self.entries.get(key)
+        return entry is None or entry['fingerprint'] != fingerprint
+
+    def doc_ids(self, key: str) -> List[str]:
+        entry = self.entries.get(key)
+        return entry['doc_ids'] if entry else []
+
+    def update(self, key: str, fingerprint: str, doc_ids: List[str]) -> None:
+        self.entries[key] = {'fingerprint': fingerprint, 'doc_ids': doc_ids}
+
+    def remove(self, key: str) -> List[str]:
+        entry = self.entries.pop(key, None)
+        return entry['doc_ids'] if entry else []
+
+    def stale_keys(self, current_keys: Set[str], scope: Optional[Set[str]] = None) -> Set[str]:
+        """ Keys in the manifest that no longer exist, optionally limited to some sources """
+        return {
+            key for key in self.entries
+            if key not in current_keys and (scope is None or key.split(':', 1)[0] in scope)
+        }
@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+from connect_alchemy import MySQLConnection
+from profiler import TableProfiler
+from schema_extractor import SchemaExtractor
+
+# One semaphore per MySQL server, shared by every scheduler in the process,
+# so source and target on the same host count against the same cap
+_server_semaphores: Dict[Tuple[str, int], threading.BoundedSemaphore] = {}
+_server_semaphores_lock = threading.Lock()
+
+
+def server_semaphore(connection_config: Dict, limit: int) -> threading.BoundedSemaphore:
+    key = (connection_config.get('host', 'localhost'), int(connection_config.get('port', 3306)))
+    with _server_semaphores_lock:
+        if key not in _server_semaphores:
+            _server_semaphores[key] = threading.BoundedSemaphore(limit)
+        return _server_semaphores[key]
+
+
+class ConnectionPool:
+    """ Small blocking pool of MySQLConnection objects for one database """
+
+    def __init__(self, connection_config: Dict, size: int):
+        self.connection_config = connection_config
+        self.size = size
+        self.created = 0
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.all_connections = []
+
+    def acquire(self) -> MySQLConnection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                conn = MySQLConnection(**self.connection_config)
+                self.all_connections.append(conn)
+                return conn
+
+        return self.idle.get()
+
+    def release(self, conn: MySQLConnection) -> None:
+        self.idle.put(conn)
+
+    def close_all(self) -> None:
+        for conn in self.all_connections:
+            conn.close()
+        self.all_connections = []
+
+
+class IntrospectionScheduler:
+    """
+    Runs schema extraction and per-table profiling for several databases at once.
+
+    All work goes through one bounded thread pool, each database gets its own
+    connection pool, and a per-server semaphore caps the number of concurrent
+    queries against any single MySQL host.
+    """
+
+    def __init__(self, max_workers: int = 4, per_server_limit: int = 4,
+                 connections_per_database: Optional[int] = None):
+        """
+        Args:
+            max_workers (int): Size of the shared worker thread pool
+            per_server_limit (int): Max concurrent queries against one host:port
+            connections_per_database (int): Connection pool size per database,
+                defaults to per_server_limit
+        """
+        self.max_workers = max_workers
+        self.per_server_limit = per_server_limit
+        self.connections_per_database = connections_per_database or per_server_limit
+
+    def run_guarded(self, pool: ConnectionPool, semaphore: threading.BoundedSemaphore, func):
+        with semaphore:
+            conn = pool.acquire()
+            try:
+                return func(conn)
+            finally:
+                pool.release(conn)
+
+    def introspect(self, connection_configs: Dict[str, Dict],
+                   should_profile: Optional[Callable[[str, Dict], bool]] = None,
+                   progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Tuple[List[Dict], List[Dict]]]:
+        """
+        Extracts schema and profiles every table of each configured database.
+
+        Args:
+            connection_configs (dict): {label: connection_config}, e.g. source_db / target_db.
+                Entries whose config is None are skipped.
+            should_profile (callable): Optional filter called with (label, schema table dict);
+                tables it rejects are not profiled
+            progress (callable): Optional progress(stage, done, total) callback for the 'schema'
+                and 'profile' stages, called from this thread; an exception it raises
+                (e.g. a cancelled job) cancels the outstanding work
+
+        Returns:
+            dict: {label: (schema_info, profile_info)} in the same format as
+            CodebaseRAG.extract_schema_info and CodebaseRAG.profile_data
+        """
+        configs = {label: cfg for label, cfg in connection_configs.items() if cfg}
+        pools = {label: ConnectionPool(cfg, self.connections_per_database) for label, cfg in configs.items()}
+        semaphores = {label: server_semaphore(cfg, self.per_server_limit) for label, cfg in configs.items()}
+        results = {}
+        start_time = time.time()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="introspect") as executor:
+                schema_futures = {}
+                column_futures = {}
+                for label, cfg in configs.items():
+                    database = cfg['database']
+                    schema_futures[label] = executor.submit(
+                        self.run_guarded, pools[label], semaphores[label],
+                        lambda conn, db=database: SchemaExtractor(conn, db).extract()
+                    )
+                    column_futures[label] = executor.submit(
+                        self.run_guarded, pools[label], semaphores[label],
+                        lambda conn, db=database: TableProfiler(conn, db).get_columns()
+                    )
+
+                # Fan the per-table profiling out as soon as each column map is known
+                profile_futures = {}
+                try:
+                    for done, (label, cfg) in enumerate(configs.items(), start=1):
+                        database = cfg['database']
+                        tables = column_futures[label].result()
+                        if should_profile:
+                            wanted = {
+                                table['table_name'] for table in schema_futures[label].result()
+                                if should_profile(label, table)
+                            }
+                            tables = {name: cols for name, cols in tables.items() if name in wanted}
+                        if progress:
+                            schema_futures[label].result()
+                            progress('schema', done, len(configs))
+
+                        profile_futures[label] = [
+                            executor.submit(
+                                self.run_guarded, pools[label], semaphores[label],
+                                lambda conn, db=database, t=table_name, c=columns:
+                                    TableProfiler(conn, db).profile_table(t, c)
+                            )
+                            for table_name, columns in tables.items()
+                        ]
+
+                    if progress:
+                        all_profiles = [future for futures in profile_futures.values() for future in futures]
+                        progress('profile', 0, len(all_profiles))
+                        for done, _ in enumerate(as_completed(all_profiles), start=1):
+                            progress('profile', done, len(all_profiles))
+                except BaseException:
+                    # Don't leave queued profiling queries behind a cancelled or failed run
+                    for futures in [list(schema_futures.values()), list(column_futures.values()),
+                                    *profile_futures.values()]:
+                        for future in futures:
+                            future.cancel()
+                    raise
+
+                for label in configs:
+                    results[label] = (
+                        schema_futures[label].result(),
+                        [future.result() for future in profile_futures[label]]
+                    )
+        finally:
+            for pool in pools.values():
+                pool.close_all()
+
+        print(f"⏱️ Introspected {', '.join(configs)} in {time.time() - start_time:.2f} seconds")
+        return results
@@ -0,0 +1,174 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Stages of an embedding build, in the order they run ('files' indexes the uploaded files)
+EMBEDDING_STAGES = ('schema', 'profile', 'chunk', 'embed', 'index_write', 'files')
+
+
+class JobCancelled(Exception):
+    """ Raised inside a job at its next progress report after cancel() """
+
+
+class Job:
+    """
+    One background job with per-stage progress and timing.
+
+    The job function reports progress through job.progress(stage, done,
+    total); that is also where a pending cancellation is raised, so work
+    stops at the next checkpoint instead of being killed mid-write.
+    """
+
+    def __init__(self, kind: str, stages: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = 'queued'
+        self.stages = OrderedDict(
+            (name, {'status': 'pending', 'done': 0, 'total': None, 'started_at': None, 'seconds': None})
+            for name in stages
+        )
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def progress(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        """ Records progress of a stage; starting a stage completes the ones before it """
+        self.check_cancelled()
+        now = time.time()
+        with self.lock:
+            for name, info in self.stages.items():
+                if name == stage:
+                    break
+                if info['status'] == 'running':
+                    self.close_stage(info, now)
+            info = self.stages.setdefault(
+                stage, {'status': 'pending', 'done': 0, 'total': None, 'started_at': None, 'seconds': None}
+            )
+            if info['status'] == 'pending':
+                info['status'] = 'running'
+                info['started_at'] = now
+            info['done'] = done
+            if total is not None:
+                info['total'] = total
+            if info['total'] is not None and done >= info['total'] and info['status'] == 'running':
+                self.close_stage(info, now)
+
+    @staticmethod
+    def close_stage(info: Dict, now: float) -> None:
+        info['status'] = 'completed'
+        info['seconds'] = round(now - info['started_at'], 2)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self.lock:
+            for info in self.stages.values():
+                if info['status'] == 'running':
+                    if status == 'completed':
+                        self.close_stage(info, now)
+                    else:
+                        info['status'] = status
+                        info['seconds'] = round(now - info['started_at'], 2)
+                elif info['status'] == 'pending' and status == 'completed':
+                    # e.g. nothing changed in an incremental build
+                    info['status'] = 'skipped'
+            self.status = status
+            self.error = error
+            self.finished_at = now
+
+    def cancel(self) -> bool:
+        """ Requests cancellation; returns False if the job already finished """
+        if self.status in ('completed', 'failed', 'cancelled'):
+            return False
+        self.cancel_event.set()
+        if self.status == 'queued':
+            self.finish('cancelled')
+        return True
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            stages = [{'name': name, **info} for name, info in self.stages.items()]
+            finished = [stage for stage in stages if stage['status'] in ('completed', 'skipped')]
+            end = self.finished_at or time.time()
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'cancel_requested': self.cancel_event.is_set(),
+                'progress': round(len(finished) / len(stages), 2) if stages else 0.0,
+                'stages': stages,
+                'created_at': self.created_at,
+                'elapsed_seconds': round(end - self.started_at, 2) if self.started_at else 0.0,
+                'error': self.error,
+                'result': self.result
+            }
+
+
+class JobQueue:
+    """
+    Runs long jobs (embedding rebuilds) on background threads so web
+    workers return immediately and clients poll a status endpoint.
+
+    Threads rather than processes: the job mutates the in-process
+    CodebaseRAG (vector store snapshot, caches) that queries read from, and
+    the heavy lifting happens in MySQL, Ollama and FAISS outside the GIL.
+    With max_workers=1 rebuilds run one at a time in submission order.
+    """
+
+    def __init__(self, max_workers: int = 1, keep_finished: int = 50):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.keep_finished = keep_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[[Job], object], stages: List[str] = EMBEDDING_STAGES) -> Job:
+        """ Queues func(job); its return value becomes job.result """
+        job = Job(kind, list(stages))
+        with self.lock:
+            self.jobs[job.id] = job
+            self.prune()
+        self.executor.submit(self.run, job, func)
+        return job
+
+    def run(self, job: Job, func: Callable[[Job], object]) -> None:
+        if job.cancel_event.is_set():
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = func(job)
+            job.finish('completed')
+            print(f"✅ Job {job.id} ({job.kind}) completed in {job.finished_at - job.started_at:.2f}s")
+        except JobCancelled:
+            job.finish('cancelled')
+            print(f"Job {job.id} ({job.kind}) cancelled")
+        except Exception as e:
+            print(f"--Error in job {job.id} ({job.kind}): {e}\n{traceback.format_exc()}")
+            job.finish('failed', str(e))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        return job is not None and job.cancel()
+
+    def list(self) -> List[Dict]:
+        return [job.to_dict() for job in reversed(list(self.jobs.values()))]
+
+    def prune(self) -> None:
+        """ Forgets the oldest finished jobs beyond keep_finished (caller holds the lock) """
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job_id]
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from langchain.chains import LLMChain
+from langchain_core.prompts import BasePromptTemplate
+from langchain_ollama.llms import OllamaLLM
+
+
+class LLMRegistry:
+    """
+    Process-wide pool of OllamaLLM clients keyed by (model, params).
+
+    Each client owns one keep-alive HTTP connection pool and is safe to share
+    across threads, so a question only pays for the generation itself. Every
+    request carries keep_alive, which keeps the model resident in Ollama
+    between questions; warm() pre-loads models at startup so the first
+    question after a restart or an idle period does not stall on a cold load.
+    """
+
+    def __init__(self, keep_alive: Union[int, str] = '30m', base_url: Optional[str] = None):
+        """
+        Args:
+            keep_alive (int or str): How long Ollama keeps a model loaded after a request, e.g. '30m' or -1 for forever
+            base_url (str): Ollama server URL, defaults to the client's default
+        """
+        self.keep_alive = keep_alive
+        self.base_url = base_url
+        self.llms: Dict[Tuple, OllamaLLM] = {}
+        self.chains: Dict[Tuple, LLMChain] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name: str, params: Dict) -> Tuple:
+        return (model_name, json.dumps(params, sort_keys=True))
+
+    def get(self, model_name: str, params: Dict) -> OllamaLLM:
+        """ Returns the shared client for a (model, params) pair, creating it on first use """
+        key = self.key(model_name, params)
+        llm = self.llms.get(key)
+        if llm is not None:
+            return llm
+        with self.lock:
+            if key not in self.llms:
+                self.llms[key] = OllamaLLM(
+                    model=model_name, keep_alive=self.keep_alive, base_url=self.base_url, **params
+                )
+            return self.llms[key]
+
+    def chain(self, model_name: str, params: Dict, prompt: BasePromptTemplate) -> LLMChain:
+        """ Returns a shared LLMChain of the pooled client and a prompt """
+        key = self.key(model_name, params) + (id(prompt),)
+        chain = self.chains.get(key)
+        if chain is not None:
+            return chain
+        llm = self.get(model_name, params)
+        with self.lock:
+            if key not in self.chains:
+                self.chains[key] = LLMChain(llm=llm, prompt=prompt)
+            return self.chains[key]
+
+    def warm(self, profiles: List[Tuple[str, Dict]]) -> None:
+        """
+        Loads each model into Ollama memory ahead of the first question.
+
+        An empty prompt makes Ollama load the model (with the profile's
+        num_ctx, so it is not reloaded later) and return without generating.
+        """
+        loaded = set()
+        for model_name, params in profiles:
+            # Ollama keys a loaded model by its name and context size; other params are per request
+            if (model_name, params.get('num_ctx')) in loaded:
+                continue
+            loaded.add((model_name, params.get('num_ctx')))
+            start_time = time.time()
+            try:
+                self.get(model_name, params).invoke("")
+                print(f"🔥 Warmed {model_name} in {time.time() - start_time:.2f}s")
+            except Exception as e:
+                print(f"--Error warming {model_name}: {e}")
+
+    def warm_async(self, profiles: List[Tuple[str, Dict]]) -> threading.Thread:
+        """ Warms the models on a background thread so startup is not blocked """
+        thread = threading.Thread(target=self.warm, args=(profiles,), name='llm-warmup', daemon=True)
+        thread.start()
+        return thread
@@ -30,5 +30,5 @@ rag.configure_databases(source_config, target_config)
 
 rag.extract_transformation_logic(transformation_logic_path)
 
-rag.create_embeddings_and_store()   
+rag.create_embeddings_and_store(incremental=True)
 rag.query_rag_system()
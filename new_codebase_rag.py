@@ -1,31 +1,129 @@
 import os
-from langchain_community.vectorstores import FAISS
 from langchain_ollama.embeddings import OllamaEmbeddings
-from langchain_ollama.llms import OllamaLLM
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import DirectoryLoader
 from langchain.chains import RetrievalQA
-from langchain.chains import LLMChain
 from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
 import time
 from chunking import EnhancedChunker
+from vector_store_manager import VectorStoreManager
+from ann_index import PROGRESS_SLICE, add_chunks, build_vector_store, delete_vectors, matches_options, resolve_options
+from embedding_cache import CachedEmbeddings
+from embedding_pipeline import BatchedEmbeddings
 from connect_alchemy import MySQLConnection
-from typing import Dict, List, Optional
+from profiler import TableProfiler
+from schema_extractor import SchemaExtractor
+from introspection import IntrospectionScheduler
+from llm_registry import LLMRegistry
+from transformation_store import TransformationLogicStore
+from prompt_budget import PromptAssembler
+from chunk_worker import chunk_file
+from file_ingest import (
+    ChunkPool, iter_documents, number_chunks, pool_worth_it, split_tasks, upload_key, upload_task
+)
+from incremental_index import (
+    FingerprintManifest, assign_chunk_ids, document_key, hash_payload, table_fingerprint
+)
+from typing import Callable, Dict, Iterable, List, Optional
 from new_prompt import VALIDATION_PROMPT, OLD_PROMPT, NEW_PROMPT
 from execute_output import ExecuteOutput
-import sqlparse
+
+# (model, Ollama params) per kind of question, picked by CodebaseRAG.select_llm_optimized
+LLM_PROFILES = {
+    'simple_sql': ("codellama:7b", {
+        "temperature": 0.0,
+        "top_k": 1,
+        "top_p": 0.1,
+        "num_predict": 256,
+        "stop": ["```", ";", "\n\n"],
+        "num_ctx": 2048,
+        "num_batch": 16
+    }),
+    'transformation': ("deepseek-r1:8b", {
+        "temperature": 0.1,
+        "top_k": 5,
+        "top_p": 0.8,
+        "repeat_penalty": 1.05,
+        "num_predict": 1024,
+        "num_ctx": 4096,
+        "num_batch": 8
+    }),
+    'validation': ("deepseek-r1:8b", {
+        "temperature": 0.05,
+        "top_k": 3,
+        "top_p": 0.7,
+        "repeat_penalty": 1.02,
+        "num_predict": 512,
+        "num_ctx": 3072
+    }),
+    'analysis': ("mistral:7b", {
+        "temperature": 0.2,
+        "top_k": 10,
+        "top_p": 0.9,
+        "repeat_penalty": 1.1,
+        "num_predict": 800,
+        "num_ctx": 3072,
+        "mirostat": 2,
+        "mirostat_tau": 5.0,
+        "mirostat_eta": 0.1
+    }),
+    'general': ("codellama:7b", {
+        "temperature": 0.1,  # Slightly higher for variety
+        "top_k": 5,          # Allow more token choices
+        "num_predict": 1024, # Increase token limit significantly
+        "num_ctx": 2048
+    })
+}
+
+def retrieved_tables(docs) -> set:
+    """ Table names behind retrieved schema/profile documents """
+    return {doc.metadata['table'] for doc in docs if doc.metadata.get('table')}
 
 class CodebaseRAG:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, introspection_workers: int = 4, per_server_limit: int = 4,
+                 embedding_cache_path: str = os.path.join('cache', 'embeddings.sqlite'),
+                 embedding_cache_size: int = 100_000, embedding_options: Optional[Dict] = None,
+                 index_options: Optional[Dict] = None, llm_keep_alive='30m',
+                 chunk_workers: Optional[int] = None, chunk_pool_min_bytes: int = 1 << 20,
+                 semantic_pooling: bool = False, semantic_batch_chars: int = 1 << 20):
         """ Initializes the CodebaseRAG instance """
         self.db_path = db_path
         self.embed_model = "nomic-embed-text"  # or mxbai-embed-large for code
-        self.embedding = OllamaEmbeddings(model=self.embed_model)
+        # Shared by the chunker and FAISS so unchanged text is never re-embedded
+        # embedding_options: batch_size, max_in_flight, queue_size, max_retries (see BatchedEmbeddings)
+        self.embedding = CachedEmbeddings(
+            BatchedEmbeddings(OllamaEmbeddings(model=self.embed_model), **(embedding_options or {})),
+            model_name=self.embed_model,
+            path=embedding_cache_path,
+            max_entries=embedding_cache_size
+        )
         self.chunker = EnhancedChunker(self.embedding)
         self.vector_db = None
+        # index_options: index_type (flat/ivf_flat/hnsw/ivf_pq), nlist, nprobe, ef_search... (see ann_index.py)
+        self.index_options = resolve_options(index_options)
+        self.store_manager = VectorStoreManager(db_path, self.embedding, index_options=self.index_options)
         self.source_db_config = None
         self.target_db_config = None
         self.transformation_path = None
+        self.scheduler = IntrospectionScheduler(
+            max_workers=introspection_workers,
+            per_server_limit=per_server_limit
+        )
+        # Fits context, transformation logic and query into each model's num_ctx
+        self.prompt_assembler = PromptAssembler(NEW_PROMPT)
+        # Parsed once per file version, indexed by the tables/columns each statement touches
+        self.transformation_store = TransformationLogicStore()
+        # Worker processes for chunking uploaded files, used once a batch reaches chunk_pool_min_bytes
+        self.chunk_workers = chunk_workers or os.cpu_count() or 1
+        self.chunk_pool_min_bytes = chunk_pool_min_bytes
+        self.chunk_pool = ChunkPool(self.chunk_workers)
+        # Semantic files are split in batches of semantic_batch_chars. Their chunks are embedded
+        # like any other; semantic_pooling uses the approximate pooled sentence vectors instead
+        self.semantic_pooling = semantic_pooling
+        self.semantic_batch_chars = semantic_batch_chars
+        # Long-lived Ollama clients shared by every query (see llm_registry.py)
+        self.llm_registry = LLMRegistry(keep_alive=llm_keep_alive)
 
     def configure_databases(self, source_config: Dict, target_config: Optional[Dict] = None):
         """ Initializes the Database configurations """
@@ -33,66 +131,45 @@ class CodebaseRAG:
         self.target_db_config = target_config
     
     def extract_transformation_logic(self, path: str) -> list:
-        """Extracts SQL statements from all files in the given directory."""
+        """Extracts SQL statements from the transformation file (parsed once, re-parsed when it changes)."""
         self.transformation_path = path
-        with open(path, 'r') as file:
-            results = file.read()
+        return list(self.transformation_store.load(path).statements)
 
-        statements = sqlparse.split(results)
+    def transformation_statements_for(self, tables: Iterable[str] = ()) -> List[str]:
+        """ Transformation statements touching the given tables, in file order """
+        if not self.transformation_path or not os.path.exists(self.transformation_path):
+            return []
+        return self.transformation_store.load(self.transformation_path).relevant(tables)
 
-        return statements
+    def build_prompt_inputs(self, query: str, retrieved_docs: List[Document], params: Dict) -> tuple:
+        """
+        NEW_PROMPT inputs fitted into the model's num_ctx (see prompt_budget.py).
+        Returns (inputs, token usage); only statements touching the retrieved tables are candidates.
+        """
+        inputs, usage = self.prompt_assembler.assemble(
+            query=query,
+            context_docs=[doc.page_content for doc in retrieved_docs],
+            transformation_statements=self.transformation_statements_for(retrieved_tables(retrieved_docs)),
+            fixed_inputs={
+                "source_db": self.source_db_config.get('database', 'source_db') if self.source_db_config else 'source_db',
+                "target_db": self.target_db_config.get('database', 'target_db') if self.target_db_config else 'target_db'
+            },
+            num_ctx=params.get('num_ctx', 2048),
+            num_predict=params.get('num_predict', 128)
+        )
+        print(f"Prompt tokens ~{usage['prompt_total']}/{usage['num_ctx'] - usage['num_predict']} "
+              f"(context {usage['context']}, transformation {usage['transformation_logic']}, query {usage['query']}; "
+              f"dropped {usage['context_docs_dropped']} docs, {usage['statements_dropped']} statements)")
+        return inputs, usage
 
     def extract_schema_info(self, connection_config: Dict) -> List[Dict]:
         """ this is used to extract the schema information from the database """
         conn = MySQLConnection(**connection_config)
-        schema_info = []
         
         try:
-            # Get tables
-            tables_df = conn.execute_query("SHOW TABLES")
-            print("Tables found:", tables_df)
-            
-            for idx, row in tables_df.iterrows():
-                table_name = row.iloc[0]  # Get first column value
-                
-                # Get columns
-                columns_df = conn.execute_query(f"""
-                        SELECT 
-                            COLUMN_NAME,
-                            DATA_TYPE,
-                            IS_NULLABLE,
-                            COLUMN_DEFAULT,
-                            COLUMN_KEY,
-                            EXTRA,
-                            CHARACTER_MAXIMUM_LENGTH,
-                            NUMERIC_PRECISION,
-                            NUMERIC_SCALE
-                        FROM INFORMATION_SCHEMA.COLUMNS 
-                        WHERE TABLE_SCHEMA = '{connection_config['database']}' 
-                        AND TABLE_NAME = '{table_name}'
-                        ORDER BY ORDINAL_POSITION
-                    """)
-                columns = columns_df.to_dict('records')  # Convert to list of dicts
-                
-                # Get foreign keys
-                fks_df = conn.execute_query(f"""
-                    SELECT 
-                        COLUMN_NAME, 
-                        REFERENCED_TABLE_NAME, 
-                        REFERENCED_COLUMN_NAME
-                    FROM 
-                        INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-                    WHERE 
-                        TABLE_NAME = '{table_name}' 
-                        AND REFERENCED_TABLE_NAME IS NOT NULL
-                """)
-                fks = fks_df.to_dict('records') if not fks_df.empty else []
-                
-                schema_info.append({
-                    'table_name': table_name,
-                    'columns': columns,
-                    'foreign_keys': fks
-                })
+            extractor = SchemaExtractor(conn, connection_config['database'])
+            schema_info = extractor.extract()
+            print("Tables found:", [table['table_name'] for table in schema_info])
         finally:
             conn.close()
                 
@@ -101,73 +178,54 @@ class CodebaseRAG:
     def profile_data(self, connection_config: Dict) -> List[Dict]:
         """ Profiles the data in the database """
         conn = MySQLConnection(**connection_config)
-        profile_info = []
         
         try:
-            tables_df = conn.execute_query("SHOW TABLES")
-            
-            for idx, row in tables_df.iterrows():
-                table_name = row.iloc[0]  # Get first column value
-                
-                # Basic stats
-                count_df = conn.execute_query(f"SELECT COUNT(*) as row_count FROM {table_name}")
-                row_count = count_df.iloc[0]['row_count']
-                
-                # Column profiles
-                columns_df = conn.execute_query(f"DESCRIBE {table_name}")
-                column_profiles = []
-                
-                for _, col_row in columns_df.iterrows():
-                    col_name = col_row['Field']
-                    col_type = col_row['Type']
-                    
-                    # Get sample values and NULL count
-                    stats_df = conn.execute_query(f"""
-                        SELECT 
-                            SUM(CASE WHEN `{col_name}` IS NULL THEN 1 ELSE 0 END) as null_count,
-                            COUNT(DISTINCT `{col_name}`) as distinct_count
-                        FROM {table_name}
-                    """)
-                    
-                    null_count = stats_df.iloc[0]['null_count']
-                    distinct_count = stats_df.iloc[0]['distinct_count']
-                    
-                    sample_df = conn.execute_query(f"""
-                        SELECT `{col_name}` 
-                        FROM {table_name} 
-                        WHERE `{col_name}` IS NOT NULL
-                        LIMIT 5
-                    """)
-                    
-                    sample_values = sample_df[col_name].tolist() if not sample_df.empty else []
-                    
-                    column_profiles.append({
-                        'name': col_name,
-                        'type': col_type,
-                        'null_count': null_count,
-                        'distinct_count': distinct_count,
-                        'sample_values': sample_values
-                    })
-                
-                profile_info.append({
-                    'table_name': table_name,
-                    'row_count': row_count,
-                    'columns': column_profiles
-                })
+            profiler = TableProfiler(conn, connection_config['database'])
+            profile_info = profiler.profile_all()
         finally:
             conn.close()
                 
         return profile_info
 
-    def create_embeddings_and_store(self):
-        """ used to create embeddings"""
+    def create_embeddings_and_store(self, incremental: bool = False,
+                                    progress: Optional[Callable[[str, int, int], None]] = None):
+        """ used to create embeddings
+
+        With incremental=True only tables whose fingerprint (columns, FKs,
+        row-count bucket) changed since the last build are profiled and
+        re-embedded; their vectors are patched into the existing index.
+
+        progress(stage, done, total) is called for the schema, profile,
+        chunk, embed and index_write stages (see job_queue.Job.progress);
+        an exception it raises aborts the build before anything is published.
+        """
         if not self.source_db_config:
             raise ValueError("Source database configuration is required")
+
+        manifest = FingerprintManifest(self.db_path)
+        if incremental and not manifest.load():
+            print("No fingerprint manifest found, doing a full rebuild")
+            incremental = False
+        if incremental:
+            # Patch a private copy; queries keep using the published snapshot until the swap
+            try:
+                working_db = self.store_manager.load_copy()
+            except Exception as e:
+                print(f"--Error loading existing index ({e}), doing a full rebuild")
+                incremental = False
+        if incremental and not matches_options(working_db.index, self.index_options):
+            print("Index metric changed, doing a full rebuild")
+            incremental = False
+
+        def table_changed(label: str, table: Dict) -> bool:
+            return not incremental or manifest.changed(f"{label}:{table['table_name']}", table_fingerprint(table))
             
-        # Extract schema and profile data
-        
-        schema_info = self.extract_schema_info(self.source_db_config)
-        profile_info = self.profile_data(self.source_db_config)
+        # Extract schema and profile data for source and target concurrently
+        introspection = self.scheduler.introspect({
+            'source_db': self.source_db_config,
+            'target_db': self.target_db_config
+        }, should_profile=table_changed, progress=progress)
+        schema_info, profile_info = introspection['source_db']
         
         # Prepare documents from schema and profile data
         from langchain.schema import Document
@@ -214,8 +272,7 @@ class CodebaseRAG:
         
         # If target DB is configured, add its data too
         if self.target_db_config:
-            target_schema = self.extract_schema_info(self.target_db_config)
-            target_profile = self.profile_data(self.target_db_config)
+            target_schema, target_profile = introspection['target_db']
             
             for table in target_schema:
                 schema_text = f"[TARGET] Table: {table['table_name']}\nColumns:\n"
@@ -266,24 +323,154 @@ class CodebaseRAG:
                     }
         ))
 
-        
-        # CAN EMBED THE UPLOADED FILES AS WELL
-        # function not written
+
+        # Uploaded files are indexed separately by ingest_files
+
 
 
+        # Fingerprint every table/document group so the next build can skip unchanged ones
+        fingerprints = {}
+        for label, (tables, _) in introspection.items():
+            for table in tables:
+                fingerprints[f"{label}:{table['table_name']}"] = table_fingerprint(table)
+        for doc in documents:
+            if doc.metadata.get('table') is None:
+                fingerprints[document_key(doc)] = hash_payload(doc.page_content)
+
+        if incremental:
+            changed_keys = {key for key, fp in fingerprints.items() if manifest.changed(key, fp)}
+            documents = [doc for doc in documents if document_key(doc) in changed_keys]
+        else:
+            changed_keys = set(fingerprints)
+            manifest.entries = {}
 
         # Chunk documents using enhanced chunker
+        if progress:
+            progress('chunk', 0, len(documents))
         chunks = self.chunker.smart_chunk_documents(documents)
+        chunk_groups = assign_chunk_ids(chunks)
+        if progress:
+            progress('chunk', len(documents), len(documents))
+
+        if incremental:
+            stale_keys = manifest.stale_keys(set(fingerprints), scope=set(introspection))
+            if not changed_keys and not stale_keys:
+                print("✅ No schema changes detected, index is up to date")
+                return
+
+            # Drop vectors of changed and removed tables, then add the new chunks
+            old_ids = [doc_id for key in changed_keys for doc_id in manifest.doc_ids(key)]
+            old_ids += [doc_id for key in stale_keys for doc_id in manifest.remove(key)]
+            indexed_ids = set(working_db.index_to_docstore_id.values())
+            old_ids = [doc_id for doc_id in old_ids if doc_id in indexed_ids]
+            if old_ids:
+                delete_vectors(working_db, old_ids, self.index_options)
+
+            new_chunks = [chunk for group in chunk_groups.values() for _, chunk in group]
+            new_ids = [doc_id for group in chunk_groups.values() for doc_id, _ in group]
+            if progress:
+                progress('embed', 0, len(new_chunks))
+            for start in range(0, len(new_chunks), PROGRESS_SLICE):
+                working_db.add_documents(new_chunks[start:start + PROGRESS_SLICE],
+                                         ids=new_ids[start:start + PROGRESS_SLICE])
+                if progress:
+                    progress('embed', min(start + PROGRESS_SLICE, len(new_chunks)), len(new_chunks))
+            print(f"♻️ Re-embedded {len(changed_keys)} changed and removed {len(stale_keys)} stale tables")
+        else:
+            # Create FAISS index
+            working_db = build_vector_store(
+                [chunk for group in chunk_groups.values() for _, chunk in group],
+                [doc_id for group in chunk_groups.values() for doc_id, _ in group],
+                self.embedding,
+                index_options=self.index_options,
+                progress=progress
+            )
+
+        for key in changed_keys:
+            manifest.update(key, fingerprints[key], [doc_id for doc_id, _ in chunk_groups.get(key, [])])
         
-        # Create FAISS index
-        self.vector_db = FAISS.from_documents(
-            documents=chunks,
-            embedding=self.embedding,
-            distance_strategy="METRIC_INNER_PRODUCT"
-        )
-        
-        # Save the index
-        self.vector_db.save_local(self.db_path)
+        # Save the index as a new version and swap it in atomically
+        if progress:
+            progress('index_write', 0, 1)
+        self.vector_db = self.store_manager.publish(working_db).vector_db
+        manifest.save()
+
+    def ingest_files(self, files: List[tuple],
+                     progress: Optional[Callable[[str, int, int], None]] = None) -> int:
+        """ Indexes uploaded files into the current vector store without touching the databases
+
+        files are (path, name[, sha256[, encoding]]) tuples. name is the
+        uploaded file name and keys the file in the fingerprint manifest with
+        its content hash, so an unchanged re-upload is skipped and a changed
+        one replaces its old chunks. Files are read lazily, one at a time.
+
+        Non-semantic files (SQL, code, JSON/CSV) are chunked in a process pool
+        and each file's chunks are embedded and merged into a working copy of
+        the index as soon as they arrive; .txt/.md files need the embedding
+        client for semantic chunking and are chunked here in batches, reusing
+        their sentence vectors for the chunks (see BatchSemanticChunker). The result is
+        published as one new version. progress('files', done, total) is
+        reported per file. Returns the number of files (re)indexed.
+        """
+        manifest = FingerprintManifest(self.db_path)
+        manifest.load()
+        # The upload store already knows each digest; hash only files that come without one
+        tasks = [upload_task(*file) for file in files]
+        digests = {name: digest for _, name, digest, _ in tasks}
+        changed = [task for task in tasks if manifest.changed(upload_key(task[1]), task[2])]
+        if not changed:
+            print("✅ Uploaded files unchanged, index is up to date")
+            return 0
+
+        working_db = None
+        if self.store_manager.current_version() is not None:
+            working_db = self.store_manager.load_copy()
+            # Drop the previous chunks of every changed file in one pass (ANN indexes rebuild on delete)
+            indexed_ids = set(working_db.index_to_docstore_id.values())
+            old_ids = [doc_id for task in changed for doc_id in manifest.doc_ids(upload_key(task[1]))
+                       if doc_id in indexed_ids]
+            if old_ids:
+                delete_vectors(working_db, old_ids, self.index_options)
+
+        done = 0
+        if progress:
+            progress('files', 0, len(changed))
+
+        def merge(name: str, chunks: List[Document], vectors=None):
+            nonlocal working_db, done
+            key = upload_key(name)
+            group = assign_chunk_ids(chunks).get(key, [])
+            ids = [doc_id for doc_id, _ in group]
+            if chunks and working_db is None:
+                working_db = build_vector_store(chunks, ids, self.embedding, index_options=self.index_options,
+                                                vectors=vectors)
+            elif chunks:
+                add_chunks(working_db, chunks, ids, vectors)
+            manifest.update(key, digests[name], ids)
+            done += 1
+            print(f"Indexed {name}: {len(chunks)} chunks")
+            if progress:
+                progress('files', done, len(changed))
+
+        pool_tasks, semantic_tasks = split_tasks(changed)
+        if pool_worth_it(pool_tasks, self.chunk_pool_min_bytes):
+            for name, chunks in self.chunk_pool.map(chunk_file, pool_tasks):
+                merge(name, chunks)
+        else:
+            for task in pool_tasks:
+                merge(*chunk_file(task))
+        batches = self.chunker.semantic_chunker.iter_batches(iter_documents(semantic_tasks), self.semantic_batch_chars)
+        for document, chunks, vectors in batches:
+            name = document.metadata['file_name']
+            chunks = self.chunker.annotate_chunks(chunks, os.path.splitext(name)[1].lower())
+            merge(name, number_chunks(chunks), vectors if self.semantic_pooling else None)
+
+        if working_db is None:
+            print("--Uploaded files produced no chunks")
+        else:
+            self.vector_db = self.store_manager.publish(working_db).vector_db
+        manifest.save()
+        return len(changed)
 
     #NOT USING FOR NOW - NEED TO CHANGE SO THAT IT CAN CHANGE BTW VALIDATION AND NORMAL QUERIES
     def classify_query(self, query: str) -> str:
@@ -306,61 +493,30 @@ class CodebaseRAG:
         
         # Simple SQL operations - Use CodeLlama (fastest)
         if any(word in query_lower for word in ["select", "count", "null", "missing", "empty"]):
-            return ("codellama:7b", {
-                "temperature": 0.0,
-                "top_k": 1,
-                "top_p": 0.1,
-                "num_predict": 256,
-                "stop": ["```", ";", "\n\n"],
-                "num_ctx": 2048,
-                "num_batch": 16
-            })
+            profile = 'simple_sql'
         
         # Complex transformations/ETL - Use DeepSeek R1 (best reasoning)
         elif any(word in query_lower for word in ["transform", "etl", "complex", "join", "migration", "compare"]):
-            return ("deepseek-r1:8b", {
-                "temperature": 0.1,
-                "top_k": 5,
-                "top_p": 0.8,
-                "repeat_penalty": 1.05,
-                "num_predict": 1024,
-                "num_ctx": 4096,
-                "num_batch": 8
-            })
+            profile = 'transformation'
         
         # Validation scripts - Use DeepSeek R1 with focused parameters
         elif any(word in query_lower for word in ["validate", "check", "verify", "test"]):
-            return ("deepseek-r1:8b", {
-                "temperature": 0.05,
-                "top_k": 3,
-                "top_p": 0.7,
-                "repeat_penalty": 1.02,
-                "num_predict": 512,
-                "num_ctx": 3072
-            })
+            profile = 'validation'
         
         # Analysis and explanations - Use Mistral
         elif any(word in query_lower for word in ["explain", "analyze", "describe", "report", "why", "how"]):
-            return ("mistral:7b", {
-                "temperature": 0.2,
-                "top_k": 10,
-                "top_p": 0.9,
-                "repeat_penalty": 1.1,
-                "num_predict": 800,
-                "num_ctx": 3072,
-                "mirostat": 2,
-                "mirostat_tau": 5.0,
-                "mirostat_eta": 0.1
-            })
+            profile = 'analysis'
         
         # Default: Fast CodeLlama for general queries
         else:
-            return ("codellama:7b", {
-                "temperature": 0.1,  # Slightly higher for variety
-                "top_k": 5,          # Allow more token choices
-                "num_predict": 1024, # Increase token limit significantly
-                "num_ctx": 2048
-            })
+            profile = 'general'
+
+        model_name, params = LLM_PROFILES[profile]
+        return (model_name, dict(params))
+
+    def llm_profiles(self) -> List[tuple]:
+        """ Every (model, params) pair select_llm_optimized can return, for warming up """
+        return [(model_name, dict(params)) for model_name, params in LLM_PROFILES.values()]
     
     def save_to_file(self,answer: str, output_type: str):
         if output_type == "script":
@@ -411,11 +567,10 @@ class CodebaseRAG:
         
 
     def load_vector_db(self):
-        self.vector_db = FAISS.load_local(
-            folder_path=self.db_path,
-            embeddings=self.embedding,
-            allow_dangerous_deserialization=True
-        )
+        snapshot = self.store_manager.snapshot()
+        if snapshot is None:
+            raise FileNotFoundError(f"No vector store found at {self.db_path}")
+        self.vector_db = snapshot.vector_db
 
     def query_rag_system(self):
         if not self.vector_db:
@@ -443,29 +598,12 @@ class CodebaseRAG:
             model_name, params = self.select_llm_optimized(query)
             print(model_name)
             
-            llm = OllamaLLM(
-                model=f"{model_name}",
-                **params
-            )
-            
             # QUERY TYPE  - VALIDAITON AND NORMAL QUERY
 
-            # Load transformation logic once
-            if hasattr(self, 'transformation_logic_path'):
-                transformation_logic = self.extract_transformation_logic(self.transformation_logic_path)
-                # Convert list to string if it's a list
-                if isinstance(transformation_logic, list):
-                    transformation_logic = "\n".join(transformation_logic)
-            else:
-                transformation_logic = "No transformation logic provided"
-
             retrieved_docs = retriever.invoke(query)
-            context = "\n".join(doc.page_content for doc in retrieved_docs)
+            prompt_inputs, _ = self.build_prompt_inputs(query, retrieved_docs, params)
 
-            llm_chain = LLMChain(
-                    llm=llm,
-                    prompt=NEW_PROMPT
-                )
+            llm_chain = self.llm_registry.chain(model_name, params, NEW_PROMPT)
 
 
             start_time = time.time()
@@ -474,13 +612,7 @@ class CodebaseRAG:
             #         "transformation_logic": transformation_logic,
             #         "query": query
             #     })
-            result = llm_chain.invoke({
-                "context": context,
-                "source_db": self.source_db_config.get('database', 'source_db'),
-                "target_db": self.target_db_config.get('database', 'target_db'),
-                "transformation_logic": transformation_logic,
-                "query": query
-            })
+            result = llm_chain.invoke(prompt_inputs)
             end_time = time.time()
             print(f"⏱️ Query processed in {end_time - start_time:.2f} seconds")
             # print(result)
@@ -0,0 +1,175 @@
+import math
+from typing import Dict, List, Optional
+from connect_alchemy import MySQLConnection
+
+# Column types where MIN/MAX is meaningless or expensive to compute, matched as substrings
+# of DATA_TYPE so tinytext/mediumtext/longtext, *blob and varbinary are covered too
+NO_MINMAX_TYPES = ('blob', 'text', 'json', 'binary', 'bit', 'geometry', 'point', 'linestring', 'polygon')
+
+# Share of occupied hash buckets above which linear counting is too coarse
+# and the column's distinct count is recounted exactly
+SATURATION = 0.9
+
+
+def has_minmax(data_type: str) -> bool:
+    return not any(kind in str(data_type).lower() for kind in NO_MINMAX_TYPES)
+
+
+class TableProfiler:
+    """
+    Set-based profiler: one aggregate query and one sample query per table.
+
+    Every column's null count, distinct count and min/max are computed in a
+    single scan instead of one query per column. Columns whose hash buckets
+    are nearly all occupied (large, mostly unique columns) get an exact
+    COUNT(DISTINCT) in one follow-up query, so a unique column still reports
+    its row count.
+    """
+
+    def __init__(self, conn: MySQLConnection, database: str,
+                 sample_values: int = 5, distinct_buckets: Optional[int] = 1 << 20):
+        """
+        Args:
+            conn (MySQLConnection): Open connection to the database being profiled
+            database (str): Schema name, used for the INFORMATION_SCHEMA lookup
+            sample_values (int): Non-null sample values kept per column
+            distinct_buckets (int): Hash buckets for the approximate distinct count,
+                None for an exact COUNT(DISTINCT)
+        """
+        self.conn = conn
+        self.database = database
+        self.sample_values = sample_values
+        self.distinct_buckets = distinct_buckets
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return "`" + str(identifier).replace("`", "``") + "`"
+
+    def get_columns(self) -> Dict[str, List[Dict]]:
+        """ Returns {table_name: [{'name', 'type'}, ...]} for the whole schema in one query """
+        columns_df = self.conn.execute_query(
+            """
+            SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = :schema
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """,
+            params={'schema': self.database}
+        )
+        tables = {}
+        if columns_df is None:
+            return tables
+
+        for row in columns_df.itertuples(index=False):
+            tables.setdefault(row.TABLE_NAME, []).append({
+                'name': row.COLUMN_NAME,
+                'type': row.COLUMN_TYPE,
+                'data_type': str(row.DATA_TYPE).lower()
+            })
+        return tables
+
+    def build_stats_query(self, table_name: str, columns: List[Dict]) -> str:
+        """ Builds the single aggregate query covering every column of the table """
+        select_list = ["COUNT(*) AS row_count"]
+
+        for i, col in enumerate(columns):
+            name = self.quote(col['name'])
+            select_list.append(f"SUM(CASE WHEN {name} IS NULL THEN 1 ELSE 0 END) AS c{i}_nulls")
+
+            if self.distinct_buckets:
+                # Linear counting: bounded hash buckets keep the temp table small
+                select_list.append(f"COUNT(DISTINCT CRC32({name}) % {int(self.distinct_buckets)}) AS c{i}_distinct")
+            else:
+                select_list.append(f"COUNT(DISTINCT {name}) AS c{i}_distinct")
+
+            if has_minmax(col.get('data_type', col['type'])):
+                select_list.append(f"MIN({name}) AS c{i}_min")
+                select_list.append(f"MAX({name}) AS c{i}_max")
+
+        return "SELECT\n    " + ",\n    ".join(select_list) + f"\nFROM {self.quote(table_name)}"
+
+    def build_sample_query(self, table_name: str, columns: List[Dict]) -> str:
+        """ Builds the single sample query for the table: up to sample_values non-null values per column """
+        table = self.quote(table_name)
+        parts = []
+        for i, col in enumerate(columns):
+            name = self.quote(col['name'])
+            parts.append(
+                f"(SELECT {i} AS col, CAST({name} AS CHAR) AS value FROM {table} "
+                f"WHERE {name} IS NOT NULL LIMIT {int(self.sample_values)})"
+            )
+        return "\nUNION ALL\n".join(parts)
+
+    def build_distinct_query(self, table_name: str, columns: List[Dict], indexes: List[int]) -> str:
+        """ Builds the exact COUNT(DISTINCT) query for the given (saturated) columns """
+        select_list = [f"COUNT(DISTINCT {self.quote(columns[i]['name'])}) AS c{i}_distinct" for i in indexes]
+        return "SELECT\n    " + ",\n    ".join(select_list) + f"\nFROM {self.quote(table_name)}"
+
+    def saturated(self, buckets_hit: int) -> bool:
+        return bool(self.distinct_buckets) and buckets_hit >= SATURATION * self.distinct_buckets
+
+    def estimate_distinct(self, buckets_hit: int, non_null: int) -> int:
+        """ Linear counting estimate from the number of occupied hash buckets """
+        if not self.distinct_buckets:
+            return buckets_hit
+
+        m = self.distinct_buckets
+        if buckets_hit >= m:
+            estimate = m * math.log(m)
+        else:
+            estimate = -m * math.log(1 - buckets_hit / m)
+        return int(min(round(estimate), non_null))
+
+    def profile_table(self, table_name: str, columns: List[Dict]) -> Dict:
+        """ Profiles a single table with one aggregate and one sample query """
+        stats_df = self.conn.execute_query(self.build_stats_query(table_name, columns))
+        if stats_df is None or stats_df.empty:
+            print(f"--Error profiling table {table_name}")
+            stats = {}
+        else:
+            stats = stats_df.iloc[0].to_dict()
+
+        # Linear counting saturates near m*ln(m) distinct values; recount those columns exactly
+        exact = {}
+        saturated = [i for i in range(len(columns)) if self.saturated(int(stats.get(f'c{i}_distinct') or 0))]
+        if saturated:
+            exact_df = self.conn.execute_query(self.build_distinct_query(table_name, columns, saturated))
+            if exact_df is not None and not exact_df.empty:
+                exact = {i: int(exact_df.iloc[0][f'c{i}_distinct']) for i in saturated}
+
+        sample_df = self.conn.execute_query(self.build_sample_query(table_name, columns)) if columns else None
+        samples = {}
+        if sample_df is not None and not sample_df.empty:
+            for i, value in sample_df.itertuples(index=False):
+                samples.setdefault(int(i), []).append(value)
+
+        row_count = int(stats.get('row_count') or 0)
+        column_profiles = []
+
+        for i, col in enumerate(columns):
+            null_count = int(stats.get(f'c{i}_nulls') or 0)
+            buckets_hit = int(stats.get(f'c{i}_distinct') or 0)
+            distinct_count = exact[i] if i in exact else self.estimate_distinct(buckets_hit, row_count - null_count)
+
+            column_profiles.append({
+                'name': col['name'],
+                'type': col['type'],
+                'null_count': null_count,
+                'distinct_count': distinct_count,
+                'min_value': stats.get(f'c{i}_min'),
+                'max_value': stats.get(f'c{i}_max'),
+                'sample_values': samples.get(i, [])
+            })
+
+        return {
+            'table_name': table_name,
+            'row_count': row_count,
+            'columns': column_profiles
+        }
+
+    def profile_all(self) -> List[Dict]:
+        """ Profiles every table in the schema """
+        return [
+            self.profile_table(table_name, columns)
+            for table_name, columns in self.get_columns().items()
+        ]
@@ -0,0 +1,153 @@
+import math
+import re
+from typing import Dict, List, Tuple
+from langchain_core.prompts import BasePromptTemplate
+
+# Single digits (llama tokenizers split numbers into digits), letter runs,
+# single punctuation marks and line breaks
+TOKEN_PATTERN = re.compile(r"\d|[^\W\d]+|[^\w\s]|\n")
+
+# Average characters per sub-word token for identifiers and long words
+CHARS_PER_TOKEN = 4
+
+NO_TRANSFORMATION_LOGIC = "No transformation logic relevant to this request"
+
+
+def piece_tokens(piece: str) -> int:
+    return max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimated token count for llama-family BPE vocabularies, not the model's tokenizer.
+
+    Digits and punctuation marks count as one token each and letter runs as
+    one token per four characters. Real counts can still be higher (rare
+    words, non-Latin text), which PromptAssembler's safety_margin absorbs.
+    """
+    if not text:
+        return 0
+    return sum(piece_tokens(piece) for piece in TOKEN_PATTERN.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """ Keeps the longest prefix of text estimated to fit in max_tokens """
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += piece_tokens(match.group())
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def query_terms(text: str) -> set:
+    return {term.lower() for term in re.findall(r"\w+", text) if len(term) > 1}
+
+
+class PromptAssembler:
+    """
+    Fits retrieved context, transformation logic and the query into a model's num_ctx.
+
+    The budget is num_ctx minus the tokens reserved for the answer
+    (num_predict), the fixed template text and a safety margin for the
+    error of the local token estimate. The query is always kept; context
+    documents (already in retriever relevance order) and transformation
+    statements (ranked by term overlap with the query) are added best-first
+    until their share is spent, and the last item that does not fit is
+    truncated rather than dropped when enough room is left.
+    """
+
+    def __init__(self, prompt: BasePromptTemplate, context_share: float = 0.7,
+                 safety_margin: int = 256, min_partial_tokens: int = 48):
+        """
+        Args:
+            prompt (PromptTemplate): Template with context, transformation_logic and query variables
+            context_share (float): Part of the section budget given to context first; unused room flows to the other section
+            safety_margin (int): Tokens kept free because count_tokens is an estimate, not the model's tokenizer
+            min_partial_tokens (int): Smallest remainder worth filling with a truncated item
+        """
+        self.prompt = prompt
+        self.context_share = context_share
+        self.safety_margin = safety_margin
+        self.min_partial_tokens = min_partial_tokens
+
+    def fill(self, items: List[str], budget: int) -> Tuple[List[str], int, int]:
+        """ Takes items in order until budget runs out; returns (kept, tokens used, items dropped) """
+        kept, used = [], 0
+        for position, item in enumerate(items):
+            tokens = count_tokens(item)
+            if used + tokens <= budget:
+                kept.append(item)
+                used += tokens
+                continue
+            remaining = budget - used
+            if remaining >= self.min_partial_tokens:
+                kept.append(truncate_tokens(item, remaining))
+                used += count_tokens(kept[-1])
+            return kept, used, len(items) - len(kept)
+        return kept, used, 0
+
+    def assemble(self, query: str, context_docs: List[str], transformation_statements: List[str],
+                 fixed_inputs: Dict[str, str], num_ctx: int, num_predict: int) -> Tuple[Dict[str, str], Dict]:
+        """
+        Returns the prompt inputs and a token usage record.
+
+        Args:
+            query (str): User request
+            context_docs (list): Retrieved document texts, most relevant first
+            transformation_statements (list): Candidate transformation statements in file order
+            fixed_inputs (dict): Other template variables (source_db, target_db)
+            num_ctx (int): Model context window
+            num_predict (int): Tokens reserved for the answer
+        """
+        template_tokens = count_tokens(self.prompt.format(
+            context='', transformation_logic='', query='', **fixed_inputs
+        ))
+        available = max(num_ctx - num_predict - template_tokens - self.safety_margin, 0)
+
+        query_tokens = count_tokens(query)
+        if query_tokens > available:
+            query = truncate_tokens(query, available)
+            query_tokens = count_tokens(query)
+        sections_budget = available - query_tokens
+
+        # Most query-relevant statements first, then back to file order for the prompt
+        terms = query_terms(query)
+        ranked = sorted(range(len(transformation_statements)),
+                        key=lambda i: -len(terms & query_terms(transformation_statements[i])))
+        context_budget = int(sections_budget * self.context_share)
+        transformation_budget = sections_budget - context_budget
+
+        # Whatever one section does not need goes to the other
+        context_needed = sum(count_tokens(doc) for doc in context_docs)
+        if context_needed < context_budget:
+            transformation_budget += context_budget - context_needed
+            context_budget = context_needed
+        kept_statements, transformation_tokens, statements_dropped = self.fill(
+            [transformation_statements[i] for i in ranked], transformation_budget
+        )
+        kept_docs, context_tokens, docs_dropped = self.fill(
+            context_docs, sections_budget - transformation_tokens
+        )
+        order = {statement: ranked[i] for i, statement in enumerate(kept_statements)}
+        kept_statements.sort(key=lambda statement: order[statement])
+
+        inputs = {
+            **fixed_inputs,
+            'context': "\n".join(kept_docs),
+            'transformation_logic': "\n".join(kept_statements) or NO_TRANSFORMATION_LOGIC,
+            'query': query
+        }
+        usage = {
+            'num_ctx': num_ctx,
+            'num_predict': num_predict,
+            'budget': available,
+            'template': template_tokens,
+            'context': context_tokens,
+            'transformation_logic': transformation_tokens,
+            'query': query_tokens,
+            'prompt_total': template_tokens + context_tokens + transformation_tokens + query_tokens,
+            'context_docs_dropped': docs_dropped,
+            'statements_dropped': statements_dropped
+        }
+        return inputs, usage
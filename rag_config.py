@@ -1,14 +1,19 @@
 import os
+from vector_store_manager import CURRENT_FILE, VERSIONS_DIR
 
 def check_for_file():
     def is_faiss_folder(path):
         if not os.path.isdir(path):
             return False
+        if os.path.exists(os.path.join(path, CURRENT_FILE)):
+            return True
         return os.path.exists(os.path.join(path, "index.faiss")) and os.path.exists(os.path.join(path, "index.pkl"))
 
     def find_faiss_dirs(base_dir):
         faiss_dirs = []
         for root, dirs, files in os.walk(base_dir):
+            # Published index versions live inside their vector store folder
+            dirs[:] = [d for d in dirs if d != VERSIONS_DIR]
             for d in dirs:
                 full_path = os.path.join(root, d)
                 if is_faiss_folder(full_path):
@@ -0,0 +1,286 @@
+import decimal
+import glob
+import gzip
+import json
+import math
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+import pandas as pd
+from result_stream import json_value
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+SPILL_FORMATS = ('csv.gz', 'parquet')
+
+RESULT_ID = re.compile(r'^\d{8}_\d{6}_\d+_[0-9a-f]{8}$')
+
+
+# Column types recorded next to a csv.gz spill (<spill>.types.json): only these are
+# parsed back from the text cells, everything else is returned as the string written
+CSV_PARSERS = {'int': int, 'decimal': decimal.Decimal, 'float': float}
+
+
+def column_type(series: pd.Series) -> Optional[str]:
+    """ Spill type of a chunk column: 'int', 'decimal', 'float', 'text', or None when it is all NULL """
+    if pd.api.types.is_bool_dtype(series):
+        return 'text'
+    if pd.api.types.is_integer_dtype(series):
+        return 'int'
+    if pd.api.types.is_float_dtype(series):
+        return 'float' if series.notna().any() else None
+    values = series.dropna()
+    if values.empty:
+        return None
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return 'int'
+    if all(isinstance(value, (int, decimal.Decimal)) and not isinstance(value, bool) for value in values):
+        return 'decimal'
+    return 'text'
+
+
+def merge_types(known: Optional[str], new: Optional[str]) -> Optional[str]:
+    """ Type of a column seen as known in earlier chunks and new in this one """
+    if known is None:
+        return new
+    if new is None or new == known:
+        return known
+    if {known, new} == {'int', 'decimal'}:
+        return 'decimal'
+    if {known, new} == {'int', 'float'}:
+        return 'float'
+    return 'text'
+
+
+def csv_value(value, parse=None):
+    """ Value of a spilled CSV cell, parsed from its text only when its column is typed as a number """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return parse(value) if parse is not None else value
+
+
+def types_path(path: str) -> str:
+    return f"{path}.types.json"
+
+
+def remove_partial(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"--Error removing partial result {path}: {e}")
+
+
+class GzipCsvSpill:
+    """
+    Streams chunks into a gzip-compressed CSV, created with the first row.
+
+    CSV keeps no types, so the column types seen in the chunks are written
+    to a small sidecar on close; csv_page() parses only integer, decimal
+    (as Decimal, exact) and float columns and leaves text such as '00123' as is.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.types: Dict[str, Optional[str]] = {}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        header = self.file is None
+        if header:
+            self.file = gzip.open(self.path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+        for name in chunk.columns:
+            self.types[str(name)] = merge_types(self.types.get(str(name)), column_type(chunk[name]))
+        chunk.to_csv(self.file, index=False, header=header)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            with open(types_path(self.path), 'w', encoding='utf-8') as f:
+                json.dump(self.types, f)
+
+    def abort(self) -> None:
+        """ Closes and deletes the file of a statement that failed or was killed """
+        if self.file is not None:
+            self.file.close()
+            remove_partial(self.path)
+
+
+class ParquetSpill:
+    """
+    Streams chunks into a Parquet file, one row group per chunk.
+
+    The schema is fixed by the first chunk, widened so later chunks of the
+    same column still fit: all-null columns become string, integers int64
+    (nullable in Arrow, exact for BIGINT) and decimals decimal256 with the
+    first chunk's scale, so values with more digits cast without loss. Like
+    the csv.gz spill, the file is created with the first row. A chunk that
+    cannot be cast without loss (e.g. a larger decimal scale) raises.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    @staticmethod
+    def widen(schema):
+        fields = []
+        for field in schema:
+            if pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            elif pa.types.is_integer(field.type):
+                field = field.with_type(pa.uint64() if pa.types.is_unsigned_integer(field.type) else pa.int64())
+            elif pa.types.is_decimal(field.type):
+                field = field.with_type(pa.decimal256(76, field.type.scale))
+            fields.append(field)
+        return pa.schema(fields)
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.widen(table.schema), compression='zstd')
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    def abort(self) -> None:
+        """ Closes and deletes the file of a statement that failed or was killed """
+        self.close()
+        if self.writer is not None:
+            remove_partial(self.path)
+
+
+class ResultStore:
+    """
+    Spill files holding the full result of every executed statement.
+
+    API responses only carry a capped preview; the complete rows are
+    streamed into <root>/result_<id>.csv.gz (or .parquet when pyarrow is
+    installed and configured) and served a page at a time by page(). A
+    csv.gz spill has its column types in <spill>.types.json next to it.
+    Only the newest max_results files are kept.
+    """
+
+    def __init__(self, root: str = 'outputs', spill_format: str = 'csv.gz', max_results: int = 200):
+        """
+        Args:
+            root (str): Folder for the spill files
+            spill_format (str): 'csv.gz' or 'parquet' (falls back to csv.gz without pyarrow)
+            max_results (int): Spill files kept; older ones are deleted as new ones are written
+        """
+        if spill_format not in SPILL_FORMATS:
+            raise ValueError(f"Unknown spill format {spill_format}, expected one of {SPILL_FORMATS}")
+        if spill_format == 'parquet' and pq is None:
+            print("--Error: pyarrow is not installed, spilling results as csv.gz instead")
+            spill_format = 'csv.gz'
+        self.root = root
+        self.spill_format = spill_format
+        self.max_results = max_results
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def new_id(statement_index: int) -> str:
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{statement_index}_{uuid.uuid4().hex[:8]}"
+
+    def path(self, result_id: str, spill_format: Optional[str] = None) -> str:
+        return os.path.join(self.root, f"result_{result_id}.{spill_format or self.spill_format}")
+
+    def spill(self, result_id: str):
+        """ Sink for result_stream.consume() writing the full result """
+        self.prune()
+        if self.spill_format == 'parquet':
+            return ParquetSpill(self.path(result_id))
+        return GzipCsvSpill(self.path(result_id))
+
+    def find(self, result_id: str) -> Optional[str]:
+        if not RESULT_ID.match(result_id):
+            return None
+        for spill_format in SPILL_FORMATS:
+            path = self.path(result_id, spill_format)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def page(self, result_id: str, offset: int = 0, limit: int = 100) -> Optional[Dict]:
+        """ Rows [offset, offset + limit) of a spilled result as JSON-safe records, reading only what is needed """
+        path = self.find(result_id)
+        if path is None:
+            return None
+        if path.endswith('.parquet'):
+            frame, total = self.parquet_page(path, offset, limit)
+        else:
+            frame, total = self.csv_page(path, offset, limit)
+        return {
+            'result_id': result_id,
+            'offset': offset,
+            'limit': limit,
+            'total_rows': total,
+            'columns': [str(column) for column in frame.columns],
+            'rows': [{key: json_value(value) for key, value in row.items()} for row in frame.to_dict('records')]
+        }
+
+    @staticmethod
+    def parquet_page(path: str, offset: int, limit: int):
+        parquet = pq.ParquetFile(path)
+        total = parquet.metadata.num_rows
+        frames, start = [], 0
+        for group in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(group).num_rows
+            # Row groups entirely before the page or after it are never read
+            if start + rows > offset and start < offset + limit:
+                # Integer columns with NULLs come back as Python ints rather than float64
+                frame = parquet.read_row_group(group).to_pandas(integer_object_nulls=True)
+                frames.append(frame.iloc[max(offset - start, 0):offset + limit - start])
+            start += rows
+        frame = pd.concat(frames) if frames else parquet.schema_arrow.empty_table().to_pandas()
+        return frame, total
+
+    @staticmethod
+    def csv_page(path: str, offset: int, limit: int):
+        # Chunked scan: skips rows before the page and counts the rest without holding them.
+        # Cells are read as text and only the page's numeric columns are parsed, using the
+        # types recorded by GzipCsvSpill (spills without them are returned as text)
+        try:
+            with open(types_path(path), encoding='utf-8') as f:
+                types = json.load(f)
+        except FileNotFoundError:
+            types = {}
+        frames, total = [], 0
+        for chunk in pd.read_csv(path, compression='gzip', chunksize=max(limit, 10_000), dtype=str,
+                                 keep_default_na=False, na_values=['']):
+            start = total
+            total += len(chunk)
+            if start + len(chunk) > offset and start < offset + limit:
+                frames.append(chunk.iloc[max(offset - start, 0):offset + limit - start])
+        if not frames:
+            return pd.DataFrame(), total
+        frame = pd.concat(frames)
+        parsers = [CSV_PARSERS.get(types.get(str(column))) for column in frame.columns]
+        rows = [[csv_value(value, parse) for value, parse in zip(row, parsers)] for row in frame.itertuples(index=False)]
+        return pd.DataFrame(rows, columns=frame.columns, dtype=object), total
+
+    def prune(self) -> None:
+        files = sorted(
+            (path for spill_format in SPILL_FORMATS for path in glob.glob(os.path.join(self.root, f"result_*.{spill_format}"))),
+            key=os.path.getmtime
+        )
+        for path in files[:max(len(files) - self.max_results + 1, 0)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"--Error removing old result {path}: {e}")
+                continue
+            remove_partial(types_path(path))
@@ -0,0 +1,138 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence
+import pandas as pd
+
+
+def json_value(value):
+    """ Plain Python value for JSON responses (numpy scalars, timestamps, NaN/NaT) """
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+
+def rows_frame(rows: Sequence[Sequence], columns: List[str]) -> pd.DataFrame:
+    """
+    DataFrame of fetched rows. An integer column with NULLs becomes nullable
+    Int64 instead of float64, which would round BIGINT values above 2^53.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for i in range(len(columns)):
+        column = frame.iloc[:, i]
+        if column.dtype.kind != 'f' or not column.hasnans:
+            continue
+        values = [row[i] for row in rows]
+        if all(value is None or (isinstance(value, int) and not isinstance(value, bool)) for value in values):
+            frame.isetitem(i, pd.array(values, dtype='Int64'))
+    return frame
+
+
+class CsvSink:
+    """ Appends chunks to a CSV file, writing the header with the first chunk """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        header = self.file is None
+        if header:
+            self.file = open(self.path, 'w', encoding='utf-8', newline='')
+        chunk.to_csv(self.file, index=False, header=header)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+class HeadTail:
+    """ Keeps the first head and last tail rows of a stream for console and dashboard previews """
+
+    def __init__(self, head: int = 5, tail: int = 5):
+        self.head_rows = head
+        self.head: Optional[pd.DataFrame] = None
+        self.tail = deque(maxlen=tail)
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if self.head is None:
+            self.head = chunk.head(self.head_rows)
+        elif len(self.head) < self.head_rows:
+            self.head = pd.concat([self.head, chunk.head(self.head_rows - len(self.head))])
+        if self.tail.maxlen:
+            self.tail.extend(chunk.tail(self.tail.maxlen).to_dict('records'))
+
+    def tail_frame(self) -> pd.DataFrame:
+        columns = list(self.head.columns) if self.head is not None else None
+        return pd.DataFrame(list(self.tail), columns=columns)
+
+    def close(self) -> None:
+        pass
+
+
+class RecordsSink:
+    """ Collects rows as JSON-safe records (the API shape), up to limit rows when one is given """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.records: List[Dict] = []
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if self.limit is not None:
+            chunk = chunk.head(max(self.limit - len(self.records), 0))
+        self.records.extend({key: json_value(value) for key, value in row.items()} for row in chunk.to_dict('records'))
+
+    def close(self) -> None:
+        pass
+
+
+def consume(chunks: Iterable[pd.DataFrame], *sinks) -> int:
+    """
+    Feeds every chunk of a streamed result to each sink in one pass; returns
+    the row count. If the stream fails, sinks with an abort() (spill files)
+    are aborted instead of closed, so no partial result is left behind.
+    """
+    rows = 0
+    try:
+        for chunk in chunks:
+            rows += len(chunk)
+            for sink in sinks:
+                sink.add(chunk)
+    except BaseException:
+        for sink in sinks:
+            getattr(sink, 'abort', sink.close)()
+        raise
+    for sink in sinks:
+        sink.close()
+    return rows
+
+
+class ColumnStats:
+    """ Per-column null counts and numeric/date min-max, accumulated chunk by chunk """
+
+    def __init__(self):
+        self.columns: Dict[str, Dict] = {}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        for name in chunk.columns:
+            series = chunk[name]
+            stats = self.columns.setdefault(str(name), {
+                'dtype': str(series.dtype), 'nulls': 0, 'non_null': 0, 'min': None, 'max': None
+            })
+            nulls = int(series.isna().sum())
+            stats['nulls'] += nulls
+            stats['non_null'] += len(series) - nulls
+            if nulls == len(series) or not (pd.api.types.is_numeric_dtype(series)
+                                           or pd.api.types.is_datetime64_any_dtype(series)):
+                continue
+            low, high = series.min(), series.max()
+            stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+            stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+
+    def to_list(self) -> List[Dict]:
+        """ JSON-safe stats in column order """
+        return [{'name': name, **{key: json_value(value) for key, value in stats.items()}}
+                for name, stats in self.columns.items()]
+
+    def close(self) -> None:
+        pass
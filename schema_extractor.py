@@ -0,0 +1,124 @@
+from typing import Dict, List
+from connect_alchemy import MySQLConnection
+
+
+class SchemaExtractor:
+    """
+    Bulk schema extractor: one INFORMATION_SCHEMA query per view for the whole
+    schema (TABLES, COLUMNS, KEY_COLUMN_USAGE, STATISTICS), grouped per table in memory.
+    """
+
+    TABLES_QUERY = """
+        SELECT
+            TABLE_NAME,
+            TABLE_TYPE,
+            ENGINE,
+            TABLE_ROWS,
+            DATA_LENGTH,
+            INDEX_LENGTH
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = :schema
+        ORDER BY TABLE_NAME
+    """
+
+    COLUMNS_QUERY = """
+        SELECT
+            TABLE_NAME,
+            COLUMN_NAME,
+            DATA_TYPE,
+            IS_NULLABLE,
+            COLUMN_DEFAULT,
+            COLUMN_KEY,
+            EXTRA,
+            CHARACTER_MAXIMUM_LENGTH,
+            NUMERIC_PRECISION,
+            NUMERIC_SCALE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = :schema
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """
+
+    FOREIGN_KEYS_QUERY = """
+        SELECT
+            TABLE_NAME,
+            COLUMN_NAME,
+            REFERENCED_TABLE_NAME,
+            REFERENCED_COLUMN_NAME
+        FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = :schema
+            AND REFERENCED_TABLE_NAME IS NOT NULL
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """
+
+    INDEXES_QUERY = """
+        SELECT
+            TABLE_NAME,
+            INDEX_NAME,
+            NON_UNIQUE,
+            SEQ_IN_INDEX,
+            COLUMN_NAME,
+            CARDINALITY,
+            INDEX_TYPE
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = :schema
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """
+
+    def __init__(self, conn: MySQLConnection, database: str):
+        self.conn = conn
+        self.database = database
+
+    def fetch(self, query: str) -> List[Dict]:
+        """ Runs one schema-wide INFORMATION_SCHEMA query and returns its rows """
+        df = self.conn.execute_query(query, params={'schema': self.database})
+        if df is None or df.empty:
+            return []
+        # NULLs come back as NaN; keep them as None like the per-table queries did
+        return df.astype(object).where(df.notna(), None).to_dict('records')
+
+    @staticmethod
+    def group_by_table(rows: List[Dict]) -> Dict[str, List[Dict]]:
+        grouped = {}
+        for row in rows:
+            table_name = row.pop('TABLE_NAME')
+            grouped.setdefault(table_name, []).append(row)
+        return grouped
+
+    @staticmethod
+    def group_indexes(rows: List[Dict]) -> List[Dict]:
+        """ Folds STATISTICS rows (one per indexed column) into one entry per index """
+        indexes = {}
+        for row in rows:
+            index = indexes.setdefault(row['INDEX_NAME'], {
+                'name': row['INDEX_NAME'],
+                'unique': not row['NON_UNIQUE'],
+                'type': row['INDEX_TYPE'],
+                'columns': [],
+                'cardinality': row['CARDINALITY']
+            })
+            index['columns'].append(row['COLUMN_NAME'])
+        return list(indexes.values())
+
+    def extract(self) -> List[Dict]:
+        """ Extracts the per-table schema dicts for the whole database """
+        tables = self.fetch(self.TABLES_QUERY)
+        columns = self.group_by_table(self.fetch(self.COLUMNS_QUERY))
+        foreign_keys = self.group_by_table(self.fetch(self.FOREIGN_KEYS_QUERY))
+        indexes = self.group_by_table(self.fetch(self.INDEXES_QUERY))
+
+        schema_info = []
+        for table in tables:
+            table_name = table['TABLE_NAME']
+            schema_info.append({
+                'table_name': table_name,
+                'columns': columns.get(table_name, []),
+                'foreign_keys': foreign_keys.get(table_name, []),
+                'indexes': self.group_indexes(indexes.get(table_name, [])),
+                'table_type': table['TABLE_TYPE'],
+                'engine': table['ENGINE'],
+                'row_estimate': table['TABLE_ROWS'],
+                'data_length': table['DATA_LENGTH'],
+                'index_length': table['INDEX_LENGTH']
+            })
+
+        return schema_info
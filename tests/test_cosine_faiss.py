@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from cosine_faiss import mmr_select, normalize_vectors
+
+
+def test_normalize_vectors_unit_length():
+    vectors = normalize_vectors([[3.0, 4.0], [1.0, 0.0]])
+    assert vectors.dtype == np.float32 and vectors.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1.0, 1.0], rtol=1e-6)
+    np.testing.assert_allclose(vectors[0], [0.6, 0.8], rtol=1e-6)
+
+
+def test_normalize_vectors_single_and_zero():
+    assert normalize_vectors([2.0, 0.0]).shape == (1, 2)
+    np.testing.assert_array_equal(normalize_vectors([[0.0, 0.0]]), [[0.0, 0.0]])
+
+
+def test_mmr_select_starts_with_best_and_skips_duplicates():
+    candidates = normalize_vectors([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+    query_scores = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+    # Pure relevance keeps score order; with diversity the near-duplicate loses to the orthogonal vector
+    assert mmr_select(query_scores, candidates, k=2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(query_scores, candidates, k=2, lambda_mult=0.5) == [0, 2]
+
+
+@pytest.mark.parametrize("k", [0, 5])
+def test_mmr_select_bounds(k):
+    candidates = normalize_vectors([[1.0, 0.0], [0.0, 1.0]])
+    selected = mmr_select(np.array([0.2, 0.1]), candidates, k=k, lambda_mult=0.7)
+    assert len(selected) == min(k, 2) and len(set(selected)) == len(selected)
+    assert mmr_select(np.array([]), candidates[:0], k=3, lambda_mult=0.7) == []
+
+
+class AxisEmbeddings(Embeddings):
+    """ Deterministic embeddings: each known text is one axis of a 3-d space """
+    axes = {'orders': [1.0, 0.0, 0.0], 'customers': [0.0, 1.0, 0.0], 'invoices': [0.0, 0.0, 1.0]}
+
+    def embed_documents(self, texts):
+        return [self.axes[text] for text in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.2, 0.1] if text == 'order' else [-1.0, -1.0, -1.0]
+
+
+@pytest.fixture
+def store():
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    from cosine_faiss import CosineFAISS
+    return CosineFAISS.from_texts(list(AxisEmbeddings.axes), AxisEmbeddings(),
+                                  distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT)
+
+
+def test_mmr_score_threshold_filters(store):
+    docs = store.max_marginal_relevance_search('order', k=3, fetch_k=3, score_threshold=0.5)
+    assert [doc.page_content for doc in docs] == ['orders']
+
+
+def test_mmr_score_threshold_falls_back_to_top_k(store):
+    # Every score is negative: nothing passes the cutoff, the top-k is still returned
+    docs = store.max_marginal_relevance_search('unrelated', k=2, fetch_k=3, score_threshold=0.3)
+    assert len(docs) == 2
@@ -0,0 +1,60 @@
+import sqlite3
+import pytest
+from langchain_core.embeddings import Embeddings
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.documents = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [float(len(text)), 0.5]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, 'test-model', path=str(tmp_path / 'embeddings.sqlite'), query_cache_size=2)
+    yield model, cache
+    cache.close()
+
+
+def test_documents_are_cached(cache):
+    model, cache = cache
+    assert cache.embed_documents(['a', 'bb', 'a']) == cache.embed_documents(['a', 'bb', 'a'])
+    assert model.documents == 2
+    assert cache.stats()['entries'] == 2
+
+
+def test_queries_stay_out_of_sqlite(cache):
+    model, cache = cache
+    assert cache.embed_query('how many orders') == cache.embed_query('how many orders')
+    assert model.queries == 1 and model.documents == 0
+    assert cache.stats()['entries'] == 0
+    # Bounded in-memory LRU
+    cache.embed_query('q2')
+    cache.embed_query('q3')
+    cache.embed_query('how many orders')
+    assert model.queries == 4
+
+
+def test_hits_touch_last_used_lazily(cache, tmp_path):
+    model, cache = cache
+    cache.embed_documents(['a'])
+    cache.db.execute("UPDATE embeddings SET last_used = 0")
+    cache.db.commit()
+
+    cache.embed_documents(['a'])
+    reader = sqlite3.connect(str(tmp_path / 'embeddings.sqlite'))
+    # The hit is pending, not written on the read path
+    assert reader.execute("SELECT last_used FROM embeddings").fetchone()[0] == 0
+    cache.embed_documents(['new text'])
+    assert reader.execute("SELECT MIN(last_used) FROM embeddings").fetchone()[0] > 0
+    reader.close()
@@ -0,0 +1,157 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from execution_guard import ExecutionGuard, GuardViolation, ScriptRun, ScriptRunRegistry, StatementCancelled
+
+
+def plan(*rows):
+    return pd.DataFrame(rows, columns=['id', 'table', 'type', 'rows', 'filtered'])
+
+
+@pytest.fixture
+def guard():
+    return ExecutionGuard(timeout_seconds=None, max_rows=100,
+                          explain_max_scan_rows=1000, explain_max_join_rows=1_000_000)
+
+
+def test_check_plan_refuses_large_full_scan(guard):
+    with pytest.raises(GuardViolation, match="full scan of orders"):
+        guard.check_plan(plan((1, 'orders', 'ALL', 5000, 100.0)))
+    # Indexed access to the same table is fine, as is a small full scan
+    guard.check_plan(plan((1, 'orders', 'ref', 5000, 100.0)))
+    guard.check_plan(plan((1, 'lookup', 'ALL', 500, 100.0)))
+
+
+def test_check_plan_refuses_large_join_product(guard):
+    cartesian = plan((1, 'src', 'index', 5000, 100.0), (1, 'tgt', 'index', 5000, 100.0))
+    with pytest.raises(GuardViolation, match="join size"):
+        guard.check_plan(cartesian)
+    # filtered% scales the estimate, and separate SELECTs (ids) are not multiplied together
+    guard.check_plan(plan((1, 'src', 'index', 5000, 100.0), (1, 'tgt', 'eq_ref', 1, 100.0)))
+    guard.check_plan(plan((1, 'src', 'index', 5000, 1.0), (1, 'tgt', 'index', 5000, 1.0)))
+    guard.check_plan(plan((1, 'src', 'index', 5000, 100.0), (2, 'tgt', 'index', 5000, 100.0)))
+
+
+def test_check_plan_ignores_missing_estimates(guard):
+    guard.check_plan(pd.DataFrame({'addr': [0], 'opcode': ['Init']}))
+    guard.check_plan(plan((1, 'orders', 'ALL', None, None)))
+
+
+def test_disabled_checks():
+    unguarded = ExecutionGuard(explain_max_scan_rows=None, explain_max_join_rows=None)
+    unguarded.check_plan(plan((1, 'src', 'ALL', 10 ** 9, 100.0), (1, 'tgt', 'ALL', 10 ** 9, 100.0)))
+
+
+def test_explainable():
+    assert ExecutionGuard.explainable("  (SELECT 1)")
+    assert ExecutionGuard.explainable("delete from t")
+    assert not ExecutionGuard.explainable("CREATE TABLE t (a int)")
+    assert not ExecutionGuard.explainable("")
+
+
+def test_watch_row_cap_kills_query(guard):
+    kills = []
+    watch = guard.watch()
+    watch.start(42, lambda: kills.append(42))
+    watch.check(100)
+    with pytest.raises(GuardViolation, match="row cap"):
+        watch.check(101)
+    assert kills == [42]
+    watch.stop()
+
+
+def test_watch_cancel_kills_running_and_refuses_new_statements(guard):
+    registry = ScriptRunRegistry()
+    run = registry.start('execute-script', 'run1')
+    kills = []
+    running = guard.watch(run)
+    running.start(7, lambda: kills.append(7))
+    assert registry.list()[0]['running_statements'] == 1
+
+    assert registry.cancel('run1')
+    assert kills == [7]
+    with pytest.raises(StatementCancelled):
+        running.check(1)
+    running.stop()
+
+    later = guard.watch(run)
+    later.start(None, lambda: kills.append('never'))
+    with pytest.raises(StatementCancelled):
+        later.check(0)
+    later.stop()
+
+    registry.finish(run)
+    assert not registry.cancel('run1') and registry.list()[0]['status'] == 'cancelled'
+    assert kills == [7]
+
+
+def test_watch_timeout_kills_query():
+    killed = threading.Event()
+    watch = ExecutionGuard(timeout_seconds=0.05).watch()
+    watch.start(1, killed.set)
+    assert killed.wait(2)
+    with pytest.raises(GuardViolation, match="time limit"):
+        watch.check(0)
+    watch.stop()
+
+
+def test_no_kill_after_stop(guard):
+    kills = []
+    run = ScriptRun('execute-sql')
+    watch = guard.watch(run)
+    watch.start(9, lambda: kills.append(9))
+    # A cancel (or timer) that picked up the watch just before the statement ended
+    late = list(run.watches)
+    watch.stop()
+    for pending in late:
+        pending.stop_query("Cancelled")
+    assert kills == [] and run.watches == []
+
+
+def test_stop_waits_for_kill_in_progress(guard):
+    events = []
+
+    def slow_kill():
+        events.append('kill started')
+        time.sleep(0.1)
+        events.append('kill done')
+
+    watch = guard.watch()
+    watch.start(5, slow_kill)
+    killer = threading.Thread(target=watch.stop_query, args=("Cancelled",))
+    killer.start()
+    while not events:
+        time.sleep(0.005)
+    watch.stop()
+    events.append('stopped')
+    killer.join()
+    assert events == ['kill started', 'kill done', 'stopped']
+
+
+def test_timeout_kills_after_early_cancel():
+    kills = []
+    two_kills = threading.Event()
+
+    def kill():
+        kills.append(1)
+        if len(kills) == 2:
+            two_kills.set()
+
+    run = ScriptRun('execute-script')
+    watch = ExecutionGuard(timeout_seconds=0.05).watch(run)
+    watch.start(3, kill)
+    # The cancel lands before the statement is executing; the time limit still kills it later
+    run.cancel()
+    assert two_kills.wait(2)
+    with pytest.raises(StatementCancelled):
+        watch.check(0)
+    watch.stop()
+
+
+def test_registry_keeps_bounded_history():
+    registry = ScriptRunRegistry(keep_finished=2)
+    for i in range(5):
+        registry.finish(registry.start('execute-sql', f'r{i}'))
+    registry.start('execute-sql', 'running')
+    assert [run['run_id'] for run in registry.list()] == ['running', 'r4', 'r3']
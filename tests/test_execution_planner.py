@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+from connect_alchemy import MySQLConnection
+from execution_planner import READ, SESSION, WRITE, ExecutionPlanner, classify
+
+
+@pytest.mark.parametrize("statement, kind", [
+    ("SELECT COUNT(*) FROM source_db.orders", READ),
+    ("WITH t AS (SELECT 1 AS a) SELECT a FROM t", READ),
+    ("SHOW TABLES", READ),
+    ("SELECT @@version", READ),
+    ("SELECT id INTO OUTFILE '/tmp/x' FROM orders", WRITE),
+    ("SELECT id FROM orders WHERE id = 1 FOR UPDATE", WRITE),
+    ("WITH old AS (SELECT id FROM orders) DELETE FROM orders WHERE id IN (SELECT id FROM old)", WRITE),
+    ("INSERT INTO target_db.orders SELECT * FROM source_db.orders", WRITE),
+    ("UPDATE orders SET status = 'x'", WRITE),
+    ("CREATE TEMPORARY TABLE t AS SELECT 1", SESSION),
+    ("SET @cutoff = '2024-01-01'", SESSION),
+    ("SELECT * FROM orders WHERE created_at > @cutoff", SESSION),
+    ("USE target_db", SESSION),
+    ("START TRANSACTION", SESSION),
+    ("", WRITE),
+])
+def test_classify(statement, kind):
+    assert classify(statement) == kind
+
+
+def numbered(*statements):
+    return list(enumerate(statements, 1))
+
+
+def test_plan_groups_reads_between_write_barriers():
+    statements = numbered("SELECT 1", "SELECT 2", "UPDATE t SET a = 1", "SELECT 3", "DELETE FROM t", "SELECT 4", "SELECT 5")
+    groups = ExecutionPlanner(max_parallel=4).plan(statements)
+    assert [[index for index, _ in group] for group in groups] == [[1, 2], [3], [4], [5], [6, 7]]
+
+
+def test_plan_is_serial_with_session_statements_or_one_worker():
+    statements = numbered("SELECT 1", "SET @a = 1", "SELECT 2")
+    assert all(len(group) == 1 for group in ExecutionPlanner(max_parallel=4).plan(statements))
+    assert all(len(group) == 1 for group in ExecutionPlanner(max_parallel=1).plan(numbered("SELECT 1", "SELECT 2")))
+
+
+def test_run_keeps_order_and_write_barriers():
+    events, lock = [], threading.Lock()
+
+    def execute(index, statement):
+        with lock:
+            events.append(('start', index))
+        time.sleep(0.05 if index == 1 else 0.01)
+        with lock:
+            events.append(('end', index))
+        return index
+
+    statements = numbered("SELECT 1", "SELECT 2", "UPDATE t SET a = 1", "SELECT 3")
+    results = list(ExecutionPlanner(max_parallel=4).run(statements, execute))
+    assert results == [(1, 1), (2, 2), (3, 3), (4, 4)]
+    # The write starts only after both reads ended, and the read after it only once it ended
+    assert events.index(('start', 3)) > max(events.index(('end', 1)), events.index(('end', 2)))
+    assert events.index(('start', 4)) > events.index(('end', 3))
+
+
+def test_run_pins_session_scripts():
+    pinned = []
+
+    class Pin:
+        def __enter__(self):
+            pinned.append('enter')
+
+        def __exit__(self, *exc):
+            pinned.append('exit')
+
+    statements = numbered("SET @a = 1", "SELECT @a")
+    results = list(ExecutionPlanner(max_parallel=4).run(statements, lambda i, s: i, pin=Pin))
+    assert results == [(1, 1), (2, 2)] and pinned == ['enter', 'exit']
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    conn = MySQLConnection('localhost', 'user', 'password', 'db')
+    conn.engine = create_engine(f"sqlite:///{tmp_path / 'planner.db'}")
+    for statement in ("CREATE TABLE t (a INTEGER)", "INSERT INTO t VALUES (1), (2), (3)"):
+        list(conn.stream_query(statement))
+    return conn
+
+
+def run_script(conn, *statements):
+    run = ExecutionPlanner(max_parallel=4).run(numbered(*statements), lambda i, s: list(conn.stream_query(s)),
+                                               pin=conn.pinned)
+    list(run)
+    return int(next(conn.stream_query("SELECT COUNT(*) AS n FROM t"))['n'][0])
+
+
+def test_pinned_script_rollback_is_not_undone_by_per_statement_commits(sqlite_conn):
+    assert run_script(sqlite_conn, "BEGIN", "DELETE FROM t WHERE a = 1", "ROLLBACK") == 3
+    assert run_script(sqlite_conn, "BEGIN", "DELETE FROM t WHERE a = 1", "COMMIT") == 2
+
+
+def test_pinned_script_commits_once_at_the_end(sqlite_conn):
+    assert run_script(sqlite_conn, "CREATE TEMPORARY TABLE tmp AS SELECT 2 AS a",
+                      "DELETE FROM t WHERE a IN (SELECT a FROM tmp)") == 2
+
+    with pytest.raises(Exception):
+        run_script(sqlite_conn, "CREATE TEMPORARY TABLE tmp2 AS SELECT 3 AS a",
+                   "DELETE FROM t WHERE a IN (SELECT a FROM tmp2)", "SELECT * FROM missing_table")
+    assert int(next(sqlite_conn.stream_query("SELECT COUNT(*) AS n FROM t"))['n'][0]) == 2
@@ -0,0 +1,78 @@
+import math
+import pandas as pd
+import pytest
+from profiler import TableProfiler, has_minmax
+
+COLUMNS = [
+    {'name': 'id', 'type': 'bigint', 'data_type': 'bigint'},
+    {'name': 'notes', 'type': 'mediumtext', 'data_type': 'mediumtext'},
+]
+
+
+class FakeConnection:
+    """ Answers the profiler's queries in order and records them """
+
+    def __init__(self, *frames):
+        self.frames = list(frames)
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append(query)
+        return self.frames.pop(0)
+
+
+def test_estimate_distinct_small_counts_are_close():
+    profiler = TableProfiler(None, 'db')
+    m = profiler.distinct_buckets
+    for n in (10, 1_000, 100_000):
+        buckets_hit = round(m * (1 - math.exp(-n / m)))
+        assert abs(profiler.estimate_distinct(buckets_hit, n) - n) <= max(1, n // 1000)
+
+
+def test_estimate_distinct_is_capped_and_exact_without_buckets():
+    assert TableProfiler(None, 'db', distinct_buckets=16).estimate_distinct(16, 20) == 20
+    assert TableProfiler(None, 'db', distinct_buckets=None).estimate_distinct(1234, 5000) == 1234
+
+
+def test_saturation_threshold():
+    profiler = TableProfiler(None, 'db', distinct_buckets=100)
+    assert not profiler.saturated(89) and profiler.saturated(90)
+    assert not TableProfiler(None, 'db', distinct_buckets=None).saturated(10 ** 9)
+
+
+@pytest.mark.parametrize("data_type, expected", [
+    ('int', True), ('varchar', True), ('datetime', True), ('bigint', True),
+    ('tinytext', False), ('longtext', False), ('mediumblob', False), ('varbinary', False),
+    ('json', False), ('bit', False), ('multipolygon', False),
+])
+def test_has_minmax(data_type, expected):
+    assert has_minmax(data_type) is expected
+
+
+def test_stats_query_skips_minmax_for_text():
+    query = TableProfiler(None, 'db').build_stats_query('t', COLUMNS)
+    assert 'MIN(`id`)' in query and 'MIN(`notes`)' not in query
+    assert f"CRC32(`id`) % {1 << 20}" in query
+
+
+def test_sample_query_takes_non_null_values_per_column():
+    query = TableProfiler(None, 'db', sample_values=3).build_sample_query('t', COLUMNS)
+    assert query.count('UNION ALL') == 1
+    assert 'WHERE `notes` IS NOT NULL LIMIT 3' in query
+
+
+def test_profile_table_recounts_saturated_columns():
+    m = 100
+    conn = FakeConnection(
+        pd.DataFrame([{'row_count': 5000, 'c0_nulls': 0, 'c0_distinct': m, 'c0_min': 1, 'c0_max': 5000,
+                       'c1_nulls': 4990, 'c1_distinct': 3}]),
+        pd.DataFrame([{'c0_distinct': 5000}]),
+        pd.DataFrame({'col': [0, 0, 1], 'value': ['1', '2', 'sparse note']}),
+    )
+    profile = TableProfiler(conn, 'db', distinct_buckets=m).profile_table('t', COLUMNS)
+
+    assert 'COUNT(DISTINCT `id`)' in conn.queries[1] and '`notes`' not in conn.queries[1]
+    id_col, notes_col = profile['columns']
+    assert id_col['distinct_count'] == 5000
+    assert notes_col['distinct_count'] == 3
+    assert id_col['sample_values'] == ['1', '2'] and notes_col['sample_values'] == ['sparse note']
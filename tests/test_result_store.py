@@ -0,0 +1,76 @@
+import decimal
+import os
+import pandas as pd
+import pytest
+from result_store import ResultStore
+from result_stream import consume, rows_frame
+
+BIG = 2 ** 60 + 1
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+SPILL_FORMATS = ['csv.gz', pytest.param('parquet', marks=pytest.mark.skipif(pyarrow is None, reason="needs pyarrow"))]
+
+
+def chunks():
+    # The NULL in the second chunk used to turn the BIGINT column into float64
+    yield rows_frame([(1, decimal.Decimal('1.50')), (BIG, decimal.Decimal('2.25'))], ['id', 'amount'])
+    yield rows_frame([(None, decimal.Decimal('123456789012.75')), (BIG + 2, None)], ['id', 'amount'])
+
+
+def test_rows_frame_keeps_bigint_with_nulls_exact():
+    frame = rows_frame([(BIG, 'a'), (None, None)], ['id', 'name'])
+    assert str(frame['id'].dtype) == 'Int64' and frame['id'][0] == BIG
+    # Real floats are left alone
+    assert rows_frame([(1.5,), (None,)], ['x'])['x'].dtype.kind == 'f'
+
+
+@pytest.mark.parametrize("spill_format", SPILL_FORMATS)
+def test_spill_round_trip_is_exact(tmp_path, spill_format):
+    store = ResultStore(root=str(tmp_path), spill_format=spill_format)
+    result_id = store.new_id(1)
+    assert consume(chunks(), store.spill(result_id)) == 4
+
+    page = store.page(result_id, offset=0, limit=10)
+    assert page['total_rows'] == 4
+    assert [row['id'] for row in page['rows']] == [1, BIG, None, BIG + 2]
+    assert decimal.Decimal(str(page['rows'][2]['amount'])) == decimal.Decimal('123456789012.75')
+
+
+@pytest.mark.parametrize("spill_format", SPILL_FORMATS)
+def test_spill_keeps_text_and_long_decimals(tmp_path, spill_format):
+    store = ResultStore(root=str(tmp_path), spill_format=spill_format)
+    result_id = store.new_id(1)
+    amount = decimal.Decimal('12345678901234567890.12')
+    rows = [('00123', amount, 0.5), ('1_000', None, None), ('nan', decimal.Decimal('-0.01'), 2.25)]
+    consume(iter([rows_frame(rows, ['code', 'amount', 'ratio'])]), store.spill(result_id))
+
+    page = store.page(result_id, offset=0, limit=10)
+    assert [row['code'] for row in page['rows']] == ['00123', '1_000', 'nan']
+    assert [row['amount'] for row in page['rows']] == [amount, None, decimal.Decimal('-0.01')]
+    assert [row['ratio'] for row in page['rows']] == [0.5, None, 2.25]
+
+
+@pytest.mark.parametrize("spill_format", SPILL_FORMATS)
+def test_no_rows_no_file(tmp_path, spill_format):
+    store = ResultStore(root=str(tmp_path), spill_format=spill_format)
+    result_id = store.new_id(1)
+    assert consume(iter([pd.DataFrame(columns=['id'])]), store.spill(result_id)) == 0
+    assert store.find(result_id) is None
+
+
+@pytest.mark.parametrize("spill_format", SPILL_FORMATS)
+def test_failed_statement_leaves_no_partial_file(tmp_path, spill_format):
+    store = ResultStore(root=str(tmp_path), spill_format=spill_format)
+    result_id = store.new_id(1)
+
+    def failing():
+        yield from chunks()
+        raise RuntimeError("Query execution was interrupted")
+
+    with pytest.raises(RuntimeError):
+        consume(failing(), store.spill(result_id))
+    assert store.find(result_id) is None and os.listdir(tmp_path) == []
@@ -0,0 +1,72 @@
+import hashlib
+import io
+import os
+import pytest
+from upload_store import UploadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / 'uploads'))
+
+
+def tmp_files(store):
+    return os.listdir(os.path.join(store.root, 'tmp'))
+
+
+def write_blocks(pending, data, block=3):
+    for start in range(0, len(data), block):
+        pending.write(data[start:start + block])
+
+
+def test_pending_upload_hashes_and_counts(store):
+    data = b'SELECT * FROM orders;\n' * 50
+    pending = store.open_upload()
+    write_blocks(pending, data)
+    assert pending.digest == hashlib.sha256(data).hexdigest()
+    assert pending.size == len(data)
+    pending.close()
+    assert tmp_files(store) == []
+
+
+@pytest.mark.parametrize("data, encoding", [
+    ('café -- ünïcode'.encode('utf-8'), 'utf-8'),
+    ('café'.encode('latin-1'), 'latin-1'),
+    # Valid utf-8 until the last multi-byte sequence is cut off
+    ('naïve'.encode('utf-8') + 'é'.encode('utf-8')[:1], 'latin-1'),
+])
+def test_pending_upload_detects_encoding(store, data, encoding):
+    pending = store.open_upload()
+    # Blocks of one byte split multi-byte characters across writes
+    write_blocks(pending, data, block=1)
+    assert pending.encoding == encoding
+    pending.close()
+
+
+def test_commit_renames_closed_file_and_deduplicates(store):
+    first = store.save(io.BytesIO(b'abc'), 'a.sql')
+    assert not first.deduplicated and open(first.path, 'rb').read() == b'abc'
+    assert first.digest == hashlib.sha256(b'abc').hexdigest()
+
+    pending = store.open_upload()
+    pending.write(b'abc')
+    second = store.commit(pending, 'b.sql')
+    assert second.deduplicated and second.path == first.path
+    assert pending.file.closed and tmp_files(store) == []
+    assert store.get('b.sql').digest == first.digest
+
+
+def test_history_and_gc(store):
+    old = store.save(io.BytesIO(b'v1'), 'a.sql')
+    store.save(io.BytesIO(b'v2'), 'a.sql')
+    assert store.stats()['orphaned'] == 1
+    assert store.gc(now=10 ** 12) == [old.digest]
+    assert not os.path.exists(old.path)
+
+
+def test_migrate_legacy(store):
+    with open(os.path.join(store.root, '20240101_120000_orders.sql'), 'wb') as f:
+        f.write(b'SELECT 1;')
+    assert store.migrate_legacy() == 1
+    assert store.get('orders.sql').size == 9
+    assert not os.path.exists(os.path.join(store.root, '20240101_120000_orders.sql'))
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import sqlparse
+from sqlparse import tokens as T
+
+# Keywords after which the next name is a table (sqlparse merges 'LEFT OUTER JOIN' etc. into one token)
+TABLE_KEYWORDS = ('FROM', 'JOIN', 'INTO', 'UPDATE', 'TABLE', 'EXISTS')
+
+
+def strip_quotes(name: str) -> str:
+    return name.strip('`"[]').lower()
+
+
+def name_groups(statement: str) -> List[Tuple[str, str]]:
+    """
+    Flattens a statement into ('name', dotted.name), ('keyword', KEYWORD),
+    ('call', name) for function calls and ('punct', char) items.
+    """
+    items = []
+    tokens = [token for token in sqlparse.parse(statement)[0].flatten()
+              if not token.is_whitespace and token.ttype not in T.Comment]
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.ttype in T.Name or token.ttype in T.Literal.String.Symbol:
+            parts = [strip_quotes(token.value)]
+            # Join schema.table / alias.column
+            while i + 2 < len(tokens) and tokens[i + 1].value == '.' and \
+                    (tokens[i + 2].ttype in T.Name or tokens[i + 2].ttype in T.Literal.String.Symbol):
+                parts.append(strip_quotes(tokens[i + 2].value))
+                i += 2
+            is_call = i + 1 < len(tokens) and tokens[i + 1].value == '('
+            items.append(('call' if is_call else 'name', '.'.join(parts)))
+        elif token.ttype in T.Keyword:
+            items.append(('keyword', token.normalized.upper()))
+        elif token.ttype in T.Punctuation:
+            items.append(('punct', token.value))
+        else:
+            items.append(('other', token.value))
+        i += 1
+    return items
+
+
+def statement_references(statement: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Best-effort (tables, columns) a statement touches, all lower case.
+
+    Tables are the names after FROM/JOIN/INTO/UPDATE/TABLE, recorded both
+    qualified (src.customers) and bare (customers); the name right after a
+    table is its alias. Every other identifier counts as a column, keeping
+    only the last part of alias.column.
+    """
+    tables, columns, aliases = set(), set(), set()
+    expecting_table = after_table = False
+    for kind, value in name_groups(statement):
+        if kind == 'keyword':
+            expecting_table = value.endswith(TABLE_KEYWORDS)
+            after_table = after_table and value == 'AS'
+        elif kind in ('name', 'call') and expecting_table:
+            # 'INSERT INTO t (a, b)' tokenizes like a call of t
+            tables.update({value, value.split('.')[-1]})
+            expecting_table, after_table = False, True
+        elif kind == 'name' and after_table:
+            aliases.add(value)
+            after_table = False
+        elif kind == 'name':
+            columns.add(value.split('.')[-1])
+        elif kind == 'punct' and value == ',' and after_table:
+            # FROM a, b
+            expecting_table, after_table = True, False
+        else:
+            expecting_table = after_table = False
+    return tables, columns - aliases - tables
+
+
+@dataclass
+class TransformationLogic:
+    """ One parsed transformation file with statements indexed by what they touch """
+    path: str
+    digest: str
+    statements: List[str]
+    tables: Dict[str, List[int]] = field(default_factory=dict)
+    columns: Dict[str, List[int]] = field(default_factory=dict)
+
+    def relevant(self, tables: Iterable[str] = (), columns: Iterable[str] = ()) -> List[str]:
+        """
+        Statements touching any of the given tables or columns, in file order.
+        With nothing to filter on, every statement is returned.
+        """
+        tables = {table.lower() for table in tables if table}
+        columns = {column.lower() for column in columns if column}
+        if not tables and not columns:
+            return list(self.statements)
+        positions = set()
+        for table in tables:
+            positions.update(self.tables.get(table, ()))
+        for column in columns:
+            positions.update(self.columns.get(column, ()))
+        return [self.statements[i] for i in sorted(positions)]
+
+
+class TransformationLogicStore:
+    """
+    Parses transformation SQL files once and re-parses only when they change.
+
+    A stat() per lookup catches edits through mtime/size; when those differ
+    the content hash decides, so a touched but identical file is not
+    re-parsed and the digest (used to scope cached answers) stays the same.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Tuple[int, int], TransformationLogic]] = {}
+        self.lock = threading.Lock()
+
+    def load(self, path: str) -> TransformationLogic:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            if entry is not None and entry[1].digest == digest:
+                logic = entry[1]
+            else:
+                logic = self.parse(path, content.decode('utf-8', errors='replace'), digest)
+                print(f"Parsed {len(logic.statements)} transformation statements from {path}")
+            self.entries[path] = (signature, logic)
+            return logic
+
+    @staticmethod
+    def parse(path: str, text: str, digest: str) -> TransformationLogic:
+        statements = [statement for statement in sqlparse.split(text) if statement.strip()]
+        logic = TransformationLogic(path, digest, statements)
+        for position, statement in enumerate(statements):
+            try:
+                tables, columns = statement_references(statement)
+            except Exception as e:
+                print(f"--Error indexing transformation statement {position}: {e}")
+                continue
+            for table in tables:
+                logic.tables.setdefault(table, []).append(position)
+            for column in columns:
+                logic.columns.setdefault(column, []).append(position)
+        return logic
+
+    def digest(self, path: Optional[str]) -> str:
+        """ Content hash of the file, '' when there is none """
+        if not path or not os.path.exists(path):
+            return ''
+        return self.load(path).digest
@@ -0,0 +1,283 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Union
+
+BLOBS_DIR = 'blobs'
+TMP_DIR = 'tmp'
+INDEX_FILE = 'uploads.json'
+
+# Legacy uploads were saved as <YYYYmmdd_HHMMSS>_<name>
+LEGACY_PREFIX = re.compile(r'^\d{8}_\d{6}_')
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    """ One upload as kept in the store """
+    name: str
+    digest: str
+    path: str
+    size: int
+    deduplicated: bool
+    encoding: str = 'utf-8'
+
+
+class PendingUpload:
+    """
+    Writable temp file in the store's tmp area that hashes, counts and
+    checks the encoding of every block written to it.
+
+    Used as werkzeug's file stream for multipart uploads, so the request
+    body lands on disk once and commit() only renames it into place. The
+    text encoding is detected while writing: utf-8 until a block fails to
+    decode, then latin-1 (which decodes any byte sequence). finish() closes
+    the file before it is renamed, since Windows cannot rename an open
+    file. Closing an upload that was never committed deletes its temp file.
+    """
+
+    def __init__(self, tmp_dir: str):
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir)
+        self.file = os.fdopen(fd, 'w+b')
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.utf8 = True
+        self.committed = False
+
+    def write(self, block: bytes) -> int:
+        self.hash.update(block)
+        self.size += len(block)
+        if self.utf8:
+            try:
+                self.decoder.decode(block)
+            except UnicodeDecodeError:
+                self.utf8 = False
+        return self.file.write(block)
+
+    @property
+    def digest(self) -> str:
+        return self.hash.hexdigest()
+
+    @property
+    def encoding(self) -> str:
+        if self.utf8:
+            try:
+                # A multi-byte sequence cut off at the end of the file
+                self.decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                self.utf8 = False
+        return 'utf-8' if self.utf8 else 'latin-1'
+
+    def finish(self) -> None:
+        """ Closes the written file, keeping it for commit """
+        self.file.close()
+
+    def close(self) -> None:
+        self.file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, attr):
+        # read/readline/seek/tell/flush for werkzeug's FileStorage
+        return getattr(self.file, attr)
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded files.
+
+    Uploads are hashed while they are written to a temp file and then moved
+    to blobs/<first two hex chars>/<sha256>, so identical content is stored
+    once however often it is uploaded. uploads.json maps each file name to
+    the digest of its latest upload plus the digests it had before.
+
+    A blob that no name currently points to is orphaned; gc() deletes
+    orphans once they have gone unused for retention_days.
+    """
+
+    def __init__(self, root: str, retention_days: float = 30, block_size: int = 1 << 20):
+        """
+        Args:
+            root (str): Upload folder
+            retention_days (float): How long an orphaned blob is kept before gc() deletes it
+            block_size (int): Bytes read per block while streaming an upload in
+        """
+        self.root = root
+        self.retention_days = retention_days
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, BLOBS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(root, TMP_DIR), exist_ok=True)
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self.index: Dict[str, Dict] = self.load_index()
+
+    def load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.index_path):
+            return {'names': {}, 'blobs': {}}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"--Error reading upload index, starting empty: {e}")
+            return {'names': {}, 'blobs': {}}
+
+    def save_index(self) -> None:
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, BLOBS_DIR, digest[:2], digest)
+
+    def open_upload(self) -> PendingUpload:
+        return PendingUpload(os.path.join(self.root, TMP_DIR))
+
+    def copy(self, stream: BinaryIO) -> PendingUpload:
+        """ Copies a stream block by block into a finished PendingUpload """
+        pending = self.open_upload()
+        try:
+            for block in iter(lambda: stream.read(self.block_size), b''):
+                pending.write(block)
+            pending.finish()
+        except BaseException:
+            pending.close()
+            raise
+        return pending
+
+    def save(self, stream: Union[BinaryIO, PendingUpload], name: str) -> StoredUpload:
+        """
+        Stores an upload under name. A PendingUpload (what the Flask request
+        parsed the body into) is committed as is; any other stream is copied
+        into one first.
+        """
+        if not isinstance(stream, PendingUpload):
+            stream = self.copy(stream)
+        return self.commit(stream, name)
+
+    def commit(self, pending: PendingUpload, name: str) -> StoredUpload:
+        """
+        Moves a fully written upload to its blob (unless the content is
+        already stored) and records name -> digest. The upload is closed
+        afterwards; a duplicate's temp file is deleted.
+        """
+        try:
+            pending.finish()
+            digest, size, encoding = pending.digest, pending.size, pending.encoding
+            path = self.blob_path(digest)
+            with self.lock:
+                deduplicated = os.path.exists(path)
+                if not deduplicated:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(pending.path, path)
+                    pending.committed = True
+                self.record(name, digest, size, encoding)
+        finally:
+            pending.close()
+
+        if deduplicated:
+            print(f"♻️ {name} is identical to stored blob {digest[:12]}, not stored again")
+        return StoredUpload(name, digest, path, size, deduplicated, encoding)
+
+    def record(self, name: str, digest: str, size: int, encoding: str) -> None:
+        """ Points name at digest in the index (caller holds the lock) """
+        now = time.time()
+        entry = self.index['names'].setdefault(name, {'digest': None, 'history': []})
+        if entry['digest'] and entry['digest'] != digest:
+            entry['history'].append(entry['digest'])
+        if digest in entry['history']:
+            entry['history'].remove(digest)
+        entry['digest'] = digest
+        entry['uploaded_at'] = now
+        blob = self.index['blobs'].setdefault(
+            digest, {'size': size, 'encoding': encoding, 'created_at': now, 'uploads': 0}
+        )
+        blob['uploads'] += 1
+        blob['last_used'] = now
+        self.save_index()
+
+    def get(self, name: str) -> Optional[StoredUpload]:
+        entry = self.index['names'].get(name)
+        if not entry or not entry['digest']:
+            return None
+        digest = entry['digest']
+        blob = self.index['blobs'][digest]
+        return StoredUpload(name, digest, self.blob_path(digest), blob['size'], True, blob.get('encoding', 'utf-8'))
+
+    def referenced(self) -> set:
+        return {entry['digest'] for entry in self.index['names'].values() if entry['digest']}
+
+    def gc(self, now: Optional[float] = None) -> List[str]:
+        """
+        Deletes orphaned blobs unused for retention_days, plus temp files
+        left by interrupted uploads. Returns the deleted digests.
+        """
+        now = now or time.time()
+        cutoff = now - self.retention_days * 86400
+        deleted = []
+        with self.lock:
+            referenced = self.referenced()
+            for digest, blob in list(self.index['blobs'].items()):
+                if digest in referenced or blob.get('last_used', blob['created_at']) > cutoff:
+                    continue
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                del self.index['blobs'][digest]
+                for entry in self.index['names'].values():
+                    if digest in entry['history']:
+                        entry['history'].remove(digest)
+                deleted.append(digest)
+            if deleted:
+                self.save_index()
+
+        tmp_root = os.path.join(self.root, TMP_DIR)
+        for name in os.listdir(tmp_root):
+            path = os.path.join(tmp_root, name)
+            # Anything an hour old is not an upload in progress
+            if os.path.getmtime(path) < now - 3600:
+                os.remove(path)
+        if deleted:
+            print(f"🧹 Removed {len(deleted)} orphaned upload blobs")
+        return deleted
+
+    def migrate_legacy(self) -> int:
+        """ Moves timestamp-prefixed uploads from the old layout into the store, oldest first """
+        legacy = sorted(
+            name for name in os.listdir(self.root)
+            if LEGACY_PREFIX.match(name) and os.path.isfile(os.path.join(self.root, name))
+        )
+        for file_name in legacy:
+            path = os.path.join(self.root, file_name)
+            with open(path, 'rb') as f:
+                pending = self.copy(f)
+            # Committed once both files are closed, so the rename and remove also work on Windows
+            self.commit(pending, LEGACY_PREFIX.sub('', file_name))
+            os.remove(path)
+        return len(legacy)
+
+    def stats(self) -> Dict:
+        blobs = self.index['blobs']
+        return {
+            'names': len(self.index['names']),
+            'blobs': len(blobs),
+            'bytes': sum(blob['size'] for blob in blobs.values()),
+            'orphaned': len(set(blobs) - self.referenced())
+        }
+
+
+if __name__ == "__main__":
+    # Fold old timestamped uploads into the store and collect garbage:
+    #   python upload_store.py <upload_folder>
+    store = UploadStore(sys.argv[1] if len(sys.argv) > 1 else 'uploads')
+    print(f"Migrated {store.migrate_legacy()} legacy uploads")
+    store.gc()
+    print(store.stats())
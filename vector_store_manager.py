@@ -0,0 +1,186 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from ann_index import set_search_params, wrap_index
+from doc_store import MmapDocstore, has_docstore, write_docstore
+
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """ An immutable view of one published index version """
+    vector_db: FAISS
+    version: str
+    loaded_at: float
+
+
+class VectorStoreManager:
+    """
+    Process-wide owner of the FAISS vector store.
+
+    The index is loaded once (memory-mapped where FAISS supports it) and
+    handed out as immutable snapshots. A rebuild writes a new version
+    directory, flips the CURRENT pointer with an atomic rename and swaps the
+    in-memory snapshot, so queries in flight keep using the version they
+    started with and never see a half-written index. Old version
+    directories are only deleted once no loaded store reads from them; one
+    still used by a request in flight is pruned on a later publish.
+
+    Layout: <db_path>/versions/<version>/ holds index.faiss plus the
+    memory-mapped docstore files (see doc_store.py) and <db_path>/CURRENT
+    holds the active version name. Legacy folders (index.faiss + pickled
+    index.pkl directly in db_path) are still loaded.
+    """
+
+    def __init__(self, db_path: str, embedding, keep_versions: int = 2, mmap: bool = True,
+                 index_options: Optional[Dict] = None):
+        """
+        Args:
+            db_path (str): Vector store folder
+            embedding (Embeddings): Embedding function attached to loaded stores
+            keep_versions (int): Published versions kept on disk
+            mmap (bool): Memory-map the FAISS index for read-only snapshots
+            index_options (dict): Search-time tuning (nprobe, ef_search) applied on load
+        """
+        self.db_path = db_path
+        self.embedding = embedding
+        self.index_options = index_options
+        self.keep_versions = keep_versions
+        self.mmap = mmap
+        self.current: Optional[IndexSnapshot] = None
+        self.lock = threading.Lock()
+        self.publish_lock = threading.Lock()
+        # version -> stores loaded from its folder that are still alive (snapshots, rebuild copies)
+        self.open_stores: Dict[str, weakref.WeakSet] = {}
+
+    @property
+    def current_file(self) -> str:
+        return os.path.join(self.db_path, CURRENT_FILE)
+
+    def current_version(self) -> Optional[str]:
+        """ Version name on disk, '' for a legacy un-versioned folder, None if nothing exists """
+        if os.path.exists(self.current_file):
+            with open(self.current_file, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        if os.path.exists(os.path.join(self.db_path, 'index.faiss')):
+            return ''
+        return None
+
+    def version_path(self, version: str) -> str:
+        return os.path.join(self.db_path, VERSIONS_DIR, version) if version else self.db_path
+
+    def read_store(self, version: str, mmap: bool) -> FAISS:
+        folder = self.version_path(version)
+        faiss = dependable_faiss_import()
+        index_file = os.path.join(folder, 'index.faiss')
+
+        index = None
+        if mmap:
+            flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            try:
+                index = faiss.read_index(index_file, flags)
+            except RuntimeError as e:
+                print(f"--Index type does not support mmap, loading into memory: {e}")
+        if index is None:
+            index = faiss.read_index(index_file)
+        set_search_params(index, self.index_options)
+
+        if has_docstore(folder):
+            docstore = MmapDocstore(folder)
+            index_to_docstore_id = docstore.index_to_docstore_id()
+        else:
+            # Legacy LangChain layout; only ever written by this application
+            with open(os.path.join(folder, 'index.pkl'), 'rb') as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+
+        vector_db = wrap_index(self.embedding, index, docstore, index_to_docstore_id)
+        with self.lock:
+            self.open_stores.setdefault(version, weakref.WeakSet()).add(vector_db)
+        return vector_db
+
+    def in_use(self, version: str) -> bool:
+        with self.lock:
+            return bool(self.open_stores.get(version))
+
+    def close_store(self, vector_db: FAISS) -> None:
+        """ Releases the memory-mapped docstore files of a store nothing will read again """
+        if isinstance(vector_db.docstore, MmapDocstore):
+            vector_db.docstore.close()
+        with self.lock:
+            for stores in self.open_stores.values():
+                stores.discard(vector_db)
+
+    def write_store(self, vector_db: FAISS, version: str) -> None:
+        folder = self.version_path(version)
+        os.makedirs(folder, exist_ok=True)
+        faiss = dependable_faiss_import()
+        faiss.write_index(vector_db.index, os.path.join(folder, 'index.faiss'))
+        write_docstore(folder, vector_db.docstore, vector_db.index_to_docstore_id)
+
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        """ Returns the current snapshot, loading it from disk on first use """
+        snapshot = self.current
+        if snapshot is not None:
+            return snapshot
+
+        with self.lock:
+            if self.current is None:
+                version = self.current_version()
+                if version is None:
+                    return None
+                self.current = IndexSnapshot(self.read_store(version, self.mmap), version, time.time())
+                print(f"Loaded vector store version '{version or 'legacy'}'")
+            return self.current
+
+    def load_copy(self) -> FAISS:
+        """ Loads a private, writable copy of the current version (for incremental rebuilds) """
+        version = self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No vector store found at {self.db_path}")
+        return self.read_store(version, mmap=False)
+
+    def publish(self, vector_db: FAISS) -> IndexSnapshot:
+        """ Writes vector_db as a new version and atomically makes it the current one """
+        with self.publish_lock:
+            version = f"v{time.time_ns()}"
+            self.write_store(vector_db, version)
+
+            tmp_file = self.current_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(version)
+            os.replace(tmp_file, self.current_file)
+
+            # Serve the version just written, not the rebuild's working copy: its docstore
+            # still reads the files of the version it was loaded from
+            snapshot = IndexSnapshot(self.read_store(version, self.mmap), version, time.time())
+            with self.lock:
+                self.current = snapshot
+            self.close_store(vector_db)
+            self.prune_versions(version)
+            print(f"✅ Published vector store version '{version}'")
+            return snapshot
+
+    def prune_versions(self, active: str) -> None:
+        versions_root = os.path.join(self.db_path, VERSIONS_DIR)
+        if not os.path.isdir(versions_root):
+            return
+        # Version names sort chronologically
+        old_versions = sorted(v for v in os.listdir(versions_root) if v != active)
+        for version in old_versions[:max(len(old_versions) - (self.keep_versions - 1), 0)]:
+            if self.in_use(version):
+                print(f"Keeping vector store version '{version}' until requests using it finish")
+                continue
+            try:
+                shutil.rmtree(os.path.join(versions_root, version))
+            except OSError as e:
+                # Retried on the next publish
+                print(f"--Error removing old vector store version '{version}': {e}")